@@ -0,0 +1,286 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+from ratelimit import TokenBucket
+
+# Lookups one browser session, and one client address across all its sessions, may start per minute
+SESSION_LOOKUPS_PER_MINUTE = float(os.environ.get("TAMIZH_SESSION_LOOKUPS_PER_MINUTE", "20"))
+CLIENT_LOOKUPS_PER_MINUTE = float(os.environ.get("TAMIZH_CLIENT_LOOKUPS_PER_MINUTE", "60"))
+
+# Separate per-hour budgets for batch runs (log streams, range analysis, correlation, exports),
+# which need many lookups at once; the whole hour's budget can be spent in one batch
+SESSION_BATCH_LOOKUPS_PER_HOUR = float(os.environ.get("TAMIZH_SESSION_BATCH_LOOKUPS_PER_HOUR", "1000"))
+CLIENT_BATCH_LOOKUPS_PER_HOUR = float(os.environ.get("TAMIZH_CLIENT_BATCH_LOOKUPS_PER_HOUR", "3000"))
+
+# Lookups allowed to run at once across every session; the rest wait in the fair queue
+UPSTREAM_CONCURRENCY = int(os.environ.get("TAMIZH_UPSTREAM_CONCURRENCY", "4"))
+
+# Only honour X-Forwarded-For when the app runs behind a proxy that sets it
+TRUST_FORWARDED_FOR = os.environ.get("TAMIZH_TRUST_FORWARDED_FOR", "0") != "0"
+
+# Idle buckets are forgotten after this long so the tables stay bounded
+BUCKET_IDLE_SECONDS = 3600.0
+
+T = TypeVar("T")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a session or client has used up its lookup budget"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"{reason} lookup limit reached, retry in {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _BucketTable:
+    """Token buckets created on first use per key, dropped once idle"""
+
+    def __init__(self, lookups_per_minute: float, capacity: Optional[float] = None):
+        self.lookups_per_minute = lookups_per_minute
+        self.capacity = capacity if capacity is not None else max(1.0, lookups_per_minute / 4)
+        self._buckets: "OrderedDict[str, Tuple[TokenBucket, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> TokenBucket:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.pop(key, None)
+            bucket = entry[0] if entry else TokenBucket(rate=self.lookups_per_minute / 60, capacity=self.capacity)
+            self._buckets[key] = (bucket, now)
+            while self._buckets:
+                oldest_key, (_, last_used) = next(iter(self._buckets.items()))
+                if now - last_used < BUCKET_IDLE_SECONDS:
+                    break
+                del self._buckets[oldest_key]
+            return bucket
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class FairQueue:
+    """
+    Limits concurrent work and hands free slots to waiting sessions in round-robin order,
+    so one session queueing many lookups cannot starve the others
+    """
+
+    def __init__(self, slots: int = UPSTREAM_CONCURRENCY):
+        self.slots = slots
+        self.in_flight = 0
+        self._waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self._condition = threading.Condition()
+
+    def _position(self, session_id: str, ticket: object) -> int:
+        """1-based place in the round-robin service order"""
+        sessions = list(self._waiting)
+        queue = self._waiting[session_id]
+        index = queue.index(ticket)
+        ahead = index
+        for position, other in enumerate(sessions):
+            if other == session_id:
+                continue
+            # Sessions earlier in the rotation are served once more before this round reaches us
+            earlier = position < sessions.index(session_id)
+            ahead += min(len(self._waiting[other]), index + (1 if earlier else 0))
+        return ahead + 1
+
+    def _next_ticket(self) -> Optional[object]:
+        return self._waiting[next(iter(self._waiting))][0] if self._waiting else None
+
+    def acquire(self, session_id: str, on_wait: Optional[Callable[[int], None]] = None,
+                poll_seconds: float = 0.5) -> float:
+        """
+        Wait for a slot, reporting the queue position through on_wait; returns seconds waited
+        """
+        ticket = object()
+        started = time.monotonic()
+        with self._condition:
+            self._waiting.setdefault(session_id, deque()).append(ticket)
+            last_position = None
+            try:
+                while not (self.in_flight < self.slots and self._next_ticket() is ticket):
+                    position = self._position(session_id, ticket)
+                    if on_wait is not None and position != last_position:
+                        # Report without holding the lock; the UI update may be slow
+                        self._condition.release()
+                        try:
+                            on_wait(position)
+                        finally:
+                            self._condition.acquire()
+                        last_position = position
+                        continue
+                    self._condition.wait(poll_seconds)
+            except BaseException:
+                # A rerun or stop interrupted the wait; give up the place in the queue
+                self._remove(session_id, ticket)
+                raise
+
+            # Take the slot and move this session to the back of the rotation
+            self._remove(session_id, ticket)
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def _remove(self, session_id: str, ticket: object):
+        queue = self._waiting.pop(session_id)
+        queue.remove(ticket)
+        if queue:
+            self._waiting[session_id] = queue
+        self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def depth(self) -> int:
+        with self._condition:
+            return sum(len(queue) for queue in self._waiting.values())
+
+
+class AdmissionController:
+    """
+    Per-session and per-client rate limits in front of a fair queue, with rejection and wait metrics
+    """
+
+    def __init__(self, session_lookups_per_minute: float = SESSION_LOOKUPS_PER_MINUTE,
+                 client_lookups_per_minute: float = CLIENT_LOOKUPS_PER_MINUTE,
+                 slots: int = UPSTREAM_CONCURRENCY, max_samples: int = 1000,
+                 session_batch_lookups_per_hour: float = SESSION_BATCH_LOOKUPS_PER_HOUR,
+                 client_batch_lookups_per_hour: float = CLIENT_BATCH_LOOKUPS_PER_HOUR):
+        self.sessions = _BucketTable(session_lookups_per_minute)
+        self.clients = _BucketTable(client_lookups_per_minute)
+        self.batch_sessions = _BucketTable(session_batch_lookups_per_hour / 60, session_batch_lookups_per_hour)
+        self.batch_clients = _BucketTable(client_batch_lookups_per_hour / 60, client_batch_lookups_per_hour)
+        self.queue = FairQueue(slots)
+        self.admitted = 0
+        self.rejected = {"session": 0, "client": 0}
+        self.max_depth = 0
+        self.waits = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def admit(self, session_id: str, client_id: str):
+        """
+        Take one token from both the session and client buckets or raise AdmissionRejected
+        """
+        self._take(self.sessions.get(session_id), self.clients.get(client_id), "")
+
+    def admit_batch(self, session_id: str, client_id: str):
+        """
+        Take one token for a batch item from the session and client batch budgets or raise AdmissionRejected
+        """
+        self._take(self.batch_sessions.get(session_id), self.batch_clients.get(client_id), " batch")
+
+    def _take(self, session_bucket: TokenBucket, client_bucket: TokenBucket, kind: str):
+        if session_bucket.available() < 1:
+            self._reject("session")
+            raise AdmissionRejected(f"Session{kind}", session_bucket.wait_time())
+        if not client_bucket.try_acquire():
+            self._reject("client")
+            raise AdmissionRejected(f"Client{kind}", client_bucket.wait_time())
+        session_bucket.try_acquire()
+        with self._lock:
+            self.admitted += 1
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.rejected[reason] += 1
+
+    @contextmanager
+    def slot(self, session_id: str, client_id: str,
+             on_wait: Optional[Callable[[int], None]] = None) -> Iterator[float]:
+        """
+        Admit a lookup, wait for its fair-queue slot and hold it for the body of the with block
+        """
+        self.admit(session_id, client_id)
+        with self.queued(session_id, on_wait) as waited:
+            yield waited
+
+    @contextmanager
+    def batch_slot(self, session_id: str, client_id: str) -> Iterator[float]:
+        """
+        Admit one batch item against the batch budgets and hold a fair-queue slot for the with block
+        """
+        self.admit_batch(session_id, client_id)
+        with self.queued(session_id) as waited:
+            yield waited
+
+    def batch_lookup(self, lookup: Callable[[str], T], session_id: str, client_id: str,
+                     rejections: Optional[List[AdmissionRejected]] = None) -> Callable[[str], Optional[T]]:
+        """
+        Wrap a lookup so every call runs in a batch slot. Once a budget is used up the call raises
+        AdmissionRejected, or, when a rejections list is given, records the rejection there and
+        returns None for this and every later call, so the batch keeps what it already has
+        """
+        def admitted(value: str) -> Optional[T]:
+            if rejections:
+                return None
+            try:
+                with self.batch_slot(session_id, client_id):
+                    return lookup(value)
+            except AdmissionRejected as e:
+                if rejections is None:
+                    raise
+                rejections.append(e)
+                return None
+        return admitted
+
+    @contextmanager
+    def queued(self, session_id: str, on_wait: Optional[Callable[[int], None]] = None) -> Iterator[float]:
+        """
+        Wait for a fair-queue slot for a lookup already admitted, and hold it for the with block
+        """
+        with self._lock:
+            self.max_depth = max(self.max_depth, self.queue.depth() + 1)
+        waited = self.queue.acquire(session_id, on_wait)
+        with self._lock:
+            self.waits.append(waited)
+        try:
+            yield waited
+        finally:
+            self.queue.release()
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            waits = sorted(self.waits)
+            rejected = dict(self.rejected)
+            admitted = self.admitted
+            max_depth = self.max_depth
+
+        def percentile(fraction: float) -> float:
+            return waits[min(len(waits) - 1, int(fraction * len(waits)))] * 1000 if waits else 0.0
+
+        return {
+            "admitted": admitted,
+            "rejected_session": rejected["session"],
+            "rejected_client": rejected["client"],
+            "in_flight": self.queue.in_flight,
+            "queue_depth": self.queue.depth(),
+            "max_queue_depth": max_depth,
+            "wait_p50_ms": percentile(0.5),
+            "wait_p95_ms": percentile(0.95),
+            "wait_max_ms": waits[-1] * 1000 if waits else 0.0,
+        }
+
+
+def streamlit_identity() -> Tuple[str, str]:
+    """
+    (session id, client address) of the current Streamlit script run
+    """
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    session_id = ctx.session_id if ctx else "local"
+
+    client_id = None
+    try:
+        forwarded = st.context.headers.get("X-Forwarded-For") if TRUST_FORWARDED_FOR else None
+        client_id = forwarded.split(",")[0].strip() if forwarded else getattr(st.context, "ip_address", None)
+    except Exception:
+        pass
+    return session_id, client_id or session_id
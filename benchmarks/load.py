@@ -0,0 +1,100 @@
+"""
+End-to-end load harness driving concurrent simulated Streamlit sessions through main.py.
+
+Each session runs in its own process (AppTest compiles the script on every
+rerun, which is not safe to do from several threads at once) and repeats
+"Track Number" clicks, or "Track IP" clicks for every other session, against
+the stub upstream server.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+from benchmarks.micro import IP_ADDRESSES, PHONE_NUMBERS
+from benchmarks.stats import peak_rss_mb, summarize
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def _run_session(session: int, interactions: int, environment: Dict[str, str],
+                 barrier) -> Tuple[List[float], float, float, float]:
+    """Run one simulated session, returning its latencies, peak RSS and active window"""
+    os.environ.update(environment)
+    os.chdir(os.path.dirname(APP_PATH))
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=120).run()
+    latencies = []
+
+    # Model a long-running server whose background warm-up has already finished
+    from warmup import warm_up
+    warm_up()
+
+    # Only the selected tab renders, so half the sessions open the IP tab and stay there
+    lookup_ip = session % 2 == 1
+    if lookup_ip:
+        app.session_state["main_tab"] = app.tabs[1].label
+        app.run()
+
+    # Start interacting together so the sessions really overlap
+    barrier.wait()
+    window_start = time.time()
+    for step in range(interactions):
+        started = time.perf_counter()
+        if not lookup_ip:
+            tab = app.tabs[0]
+            tab.text_input[0].input(PHONE_NUMBERS[(session + step) % len(PHONE_NUMBERS)])
+        else:
+            tab = app.tabs[1]
+            tab.text_input[0].input(IP_ADDRESSES[(session + step) % len(IP_ADDRESSES)])
+        tab.button[0].click()
+        app.run()
+        latencies.append(time.perf_counter() - started)
+        if app.exception:
+            raise RuntimeError(f"Session {session} failed: {app.exception[0].message}")
+    return latencies, peak_rss_mb(), window_start, time.time()
+
+
+def run_load(sessions: int = 4, interactions: int = 6) -> Dict[str, float]:
+    """
+    Drive `sessions` concurrent app sessions and summarise the interaction latencies
+    """
+    environment = {key: value for key, value in os.environ.items()
+                   if key in ("IPAPI_BASE_URL", "NOMINATIM_DOMAIN", "NOMINATIM_SCHEME") or key.startswith("TAMIZH_")}
+    # Measure the lookup path itself, not the per-session admission limits
+    environment.setdefault("TAMIZH_SESSION_LOOKUPS_PER_MINUTE", "1000000")
+    environment.setdefault("TAMIZH_CLIENT_LOOKUPS_PER_MINUTE", "1000000")
+    # Simulated lookups must not land in the real report archive or watchlist
+    scratch = tempfile.TemporaryDirectory()
+    environment["TAMIZH_REPORT_ARCHIVE"] = os.path.join(scratch.name, "report_archive.sqlite")
+    environment["TAMIZH_WATCHLIST_DB"] = os.path.join(scratch.name, "watchlist.sqlite")
+    context = multiprocessing.get_context("spawn")
+    existing_maps = set(glob.glob(os.path.join(os.path.dirname(APP_PATH), "phone_*_map.html")))
+    latencies = []
+    session_rss = []
+    windows = []
+    with scratch, context.Manager() as manager, \
+            ProcessPoolExecutor(max_workers=sessions, mp_context=context) as executor:
+        barrier = manager.Barrier(sessions)
+        futures = [executor.submit(_run_session, session, interactions, environment, barrier)
+                   for session in range(sessions)]
+        for future in futures:
+            session_latencies, rss, window_start, window_end = future.result()
+            latencies.extend(session_latencies)
+            session_rss.append(rss)
+            windows.append((window_start, window_end))
+
+    # The phone tab saves a map HTML file per phone lookup into the working directory
+    for path in glob.glob(os.path.join(os.path.dirname(APP_PATH), "phone_*_map.html")):
+        if path not in existing_maps:
+            os.remove(path)
+
+    elapsed = max(end for _, end in windows) - min(start for start, _ in windows)
+    summary = summarize(latencies, elapsed)
+    summary["sessions"] = sessions
+    summary["peak_session_rss_mb"] = max(session_rss)
+    return summary
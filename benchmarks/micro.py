@@ -0,0 +1,89 @@
+"""
+Micro-benchmarks for each lookup and rendering stage in utils.
+"""
+import itertools
+import os
+import time
+from typing import Callable, Dict, Iterable
+
+import numpy as np
+
+import utils
+from benchmarks.stats import summarize
+from correlation import correlate_arrays
+
+PHONE_NUMBERS = ["+919876543210", "+442079460958", "+12125550199"]
+IP_ADDRESSES = ["8.8.8.8", "1.1.1.1", "49.205.0.1"]
+TIMESTAMP = "2024-01-01 00:00:00"
+CORRELATION_PAIRS = 100_000
+WARMUP_CALLS = 3
+ROUNDS = 5
+
+
+def _time_calls(function: Callable, arguments: Iterable, iterations: int,
+                warmup: int = WARMUP_CALLS, rounds: int = ROUNDS) -> Dict[str, float]:
+    """
+    Time a function over several rounds. p50 and throughput come from the quietest round,
+    to damp machine noise; p99 is pooled over every call so the tail has enough samples.
+    """
+    arguments = itertools.cycle(arguments)
+    for _ in range(warmup):
+        function(next(arguments))
+
+    pooled = []
+    summaries = []
+    for _ in range(rounds):
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(iterations):
+            argument = next(arguments)
+            call_started = time.perf_counter()
+            function(argument)
+            latencies.append(time.perf_counter() - call_started)
+        summaries.append(summarize(latencies, time.perf_counter() - started))
+        pooled.extend(latencies)
+    summary = min(summaries, key=lambda summary: summary["p50_ms"])
+    tail = summarize(pooled, 0.0)
+    return {**summary, "calls": tail["calls"], "p99_ms": tail["p99_ms"]}
+
+
+def _pdf_report(phone_info):
+    os.remove(utils.generate_pdf_report(phone_info, TIMESTAMP))
+
+
+def _ip_pdf_report(ip_info):
+    os.remove(utils.generate_ip_pdf_report(ip_info, TIMESTAMP))
+
+
+def _correlation_batches(count: int):
+    """Random coordinate and timezone columns for one correlation batch"""
+    rng = np.random.default_rng(0)
+    zones = np.array(["Asia/Kolkata", "Asia/Calcutta", "Europe/London", "America/New_York", "Unknown"])
+    columns = [rng.uniform(-90, 90, count), rng.uniform(-180, 180, count),
+               rng.uniform(-90, 90, count), rng.uniform(-180, 180, count)]
+    return [columns + [zones[rng.integers(0, len(zones), count)].tolist() for _ in range(2)]]
+
+
+def run_micro(iterations: int = 200) -> Dict[str, Dict[str, float]]:
+    """
+    Run every micro-benchmark; upstream lookups must already point at a stub server
+    """
+    phone_infos = [utils.get_phone_info(number) for number in PHONE_NUMBERS]
+    ip_infos = [utils.get_ip_info(ip) for ip in IP_ADDRESSES]
+    # Folium appends to a map's scripts on every render, so like the app each render gets a fresh map
+    maps = [utils.get_location_map(phone_infos[index % len(phone_infos)])
+            for index in range(WARMUP_CALLS + ROUNDS * iterations)]
+
+    return {
+        "get_phone_info": _time_calls(utils.get_phone_info, PHONE_NUMBERS, iterations),
+        "get_ip_info": _time_calls(utils.get_ip_info, IP_ADDRESSES, iterations),
+        "generate_report": _time_calls(lambda info: utils.generate_report(info, TIMESTAMP), phone_infos, iterations),
+        "generate_ip_report": _time_calls(lambda info: utils.generate_ip_report(info, TIMESTAMP), ip_infos, iterations),
+        "generate_pdf_report": _time_calls(_pdf_report, phone_infos, iterations),
+        "generate_ip_pdf_report": _time_calls(_ip_pdf_report, ip_infos, iterations),
+        "get_location_map": _time_calls(utils.get_location_map, phone_infos, iterations),
+        "render_location_map": _time_calls(lambda m: m._repr_html_(), maps, iterations),
+        # One call scores CORRELATION_PAIRS phone/IP pairs
+        "correlate_arrays": _time_calls(lambda batch: correlate_arrays(*batch),
+                                        _correlation_batches(CORRELATION_PAIRS), max(1, iterations // 5)),
+    }
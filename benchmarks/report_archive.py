@@ -0,0 +1,116 @@
+"""
+Size and throughput benchmark for the compressed report archive.
+
+Run from the repository root:
+    python -m benchmarks.report_archive --reports 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import zlib
+
+import utils
+from benchmarks.results_memory import synthetic_phone_info
+from benchmarks.stats import percentile
+from report_archive import ReportArchive
+
+TIMESTAMP = "2024-01-01 00:00:00"
+PDF_POOL_SIZE = 64
+
+
+def pdf_pool(rng: random.Random):
+    """A few dozen distinct rendered PDFs; rendering a million would dominate the run"""
+    pool = []
+    for index in range(PDF_POOL_SIZE):
+        info = synthetic_phone_info(index, rng)
+        path = utils.generate_pdf_report(info, TIMESTAMP)
+        with open(path, "rb") as f:
+            pool.append(f.read())
+        os.remove(path)
+    return pool
+
+
+def synthetic_reports(count: int, pdf_every: int, seed: int):
+    """Phone reports with varied metadata, every pdf_every-th one a PDF"""
+    rng = random.Random(seed)
+    pdfs = pdf_pool(rng)
+    started = time.time() - 180 * 86400
+    for index in range(count):
+        info = synthetic_phone_info(index, rng)
+        if pdf_every and index % pdf_every == 0:
+            report_format, payload = "pdf", pdfs[index % len(pdfs)]
+        else:
+            report_format, payload = "text", utils.generate_report(info, TIMESTAMP).encode("utf-8")
+        yield {
+            "kind": "phone", "format": report_format, "subject": info["formatted_number"],
+            "payload": payload, "country": info["country"], "carrier": info["carrier"],
+            "created_at": started + index * (180 * 86400 / count),
+        }
+
+
+def time_queries(run, count: int):
+    latencies = []
+    for index in range(count):
+        query_started = time.perf_counter()
+        run(index)
+        latencies.append((time.perf_counter() - query_started) * 1000)
+    latencies.sort()
+    return percentile(latencies, 0.5), percentile(latencies, 0.99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--reports", type=int, default=1_000_000)
+    parser.add_argument("--pdf-every", type=int, default=2, help="Archive a PDF as every Nth report (0 = none)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--codec", default="auto", choices=("auto", "zstd", "zlib"))
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        archive = ReportArchive(os.path.join(directory, "archive.sqlite"), codec=args.codec)
+
+        started = time.perf_counter()
+        archive.add_many(synthetic_reports(args.reports, args.pdf_every, args.seed))
+        insert_seconds = time.perf_counter() - started
+        stats = archive.stats()
+
+        print(f"reports: {stats['reports']:,}  codec: {archive.codec}")
+        print(f"insert:  {stats['reports'] / insert_seconds:10,.0f} reports/s  ({insert_seconds:.1f}s, "
+              f"including rendering the text reports)")
+        print(f"raw:     {stats['raw_bytes'] / 2**20:10,.1f} MiB  ({stats['raw_bytes'] / stats['reports']:.0f} B/report)")
+        print(f"stored:  {stats['stored_bytes'] / 2**20:10,.1f} MiB  ({stats['stored_bytes'] / stats['reports']:.0f} B/report, "
+              f"ratio {stats['ratio']:.1f}x)")
+        print(f"file:    {stats['file_bytes'] / 2**20:10,.1f} MiB  (payloads, metadata and indexes)")
+
+        # Same sample compressed report by report without the shared dictionary
+        sample = list(synthetic_reports(min(args.reports, 2000), args.pdf_every, args.seed + 1))
+        plain = sum(len(zlib.compress(report["payload"], 9)) for report in sample)
+        raw = sum(len(report["payload"]) for report in sample)
+        print(f"zlib without dictionary on a sample: ratio {raw / plain:.1f}x")
+
+        rng = random.Random(args.seed)
+        subjects = [row["subject"] for row in archive.search(limit=args.queries * 5)]
+        windows = [(row["created_at"] - 86400, row["created_at"])
+                   for row in archive.search(limit=args.queries * 5)]
+        p50, p99 = time_queries(lambda i: archive.search(subject=rng.choice(subjects)), args.queries)
+        print(f"search by number:            p50 {p50:7.3f} ms  p99 {p99:7.3f} ms")
+        p50, p99 = time_queries(lambda i: archive.search(country="India", since=windows[i % len(windows)][0],
+                                                         until=windows[i % len(windows)][1]), args.queries)
+        print(f"search by country and day:   p50 {p50:7.3f} ms  p99 {p99:7.3f} ms")
+        p50, p99 = time_queries(lambda i: archive.search(carrier="Jio", limit=100), args.queries)
+        print(f"search by carrier (newest):  p50 {p50:7.3f} ms  p99 {p99:7.3f} ms")
+
+        ids = [rng.randrange(1, stats["reports"] + 1) for _ in range(args.queries * 10)]
+        started = time.perf_counter()
+        read_bytes = sum(len(chunk) for report_id in ids for chunk in archive.stream_report(report_id))
+        read_seconds = time.perf_counter() - started
+        print(f"random streaming reads:  {len(ids) / read_seconds:10,.0f} reports/s  "
+              f"({read_bytes / 2**20 / read_seconds:.1f} MiB/s)")
+        archive.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Memory benchmark for batch results: a list of per-lookup dicts versus ResultsTable.
+
+Run from the repository root:
+    python -m benchmarks.results_memory --rows 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from results import PhoneResult, ResultsTable
+
+COUNTRIES = ["India", "United Kingdom", "United States", "Germany", "Brazil", "Japan"]
+CARRIERS = ["Airtel", "Jio", "Vodafone", "O2", "Verizon", "T-Mobile", "Vivo", "NTT Docomo"]
+TIMEZONES = ["Asia/Calcutta", "Europe/London", "America/New_York", "Europe/Berlin", "America/Sao_Paulo", "Asia/Tokyo"]
+
+
+def synthetic_phone_info(index: int, rng: random.Random) -> dict:
+    """A get_phone_info-shaped dict, with roughly 1% failed lookups"""
+    if rng.random() < 0.01:
+        return {
+            "country": "Error", "state": "Error", "district": "Error", "city": "Error",
+            "carrier": "Error", "timezone": "Error", "number_type": "Error", "is_valid": False,
+            "formatted_number": "Error", "latitude": None, "longitude": None,
+        }
+    country = rng.randrange(len(COUNTRIES))
+    return {
+        "country": COUNTRIES[country],
+        "state": f"State {rng.randrange(40)}",
+        "district": f"District {rng.randrange(500)}",
+        "city": f"City {rng.randrange(2000)}",
+        "carrier": rng.choice(CARRIERS),
+        "timezone": TIMEZONES[country],
+        "number_type": rng.choice((0, 1, 2)),
+        "is_valid": True,
+        "formatted_number": f"+91 {9000000000 + index}",
+        "latitude": rng.uniform(-60, 60),
+        "longitude": rng.uniform(-180, 180),
+    }
+
+
+def measure(build):
+    """Peak traced allocation and wall time of building a structure"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    def build_dicts():
+        rng = random.Random(args.seed)
+        return [synthetic_phone_info(index, rng) for index in range(args.rows)]
+
+    def build_table():
+        rng = random.Random(args.seed)
+        table = ResultsTable(PhoneResult)
+        for index in range(args.rows):
+            table.append(PhoneResult.from_info(synthetic_phone_info(index, rng)))
+        return table
+
+    dicts, dict_bytes, dict_seconds = measure(build_dicts)
+    del dicts
+    table, table_bytes, table_seconds = measure(build_table)
+
+    print(f"rows: {args.rows:,}")
+    print(f"list of dicts:  {dict_bytes / 2**20:8.1f} MiB  built in {dict_seconds:6.2f}s")
+    print(f"ResultsTable:   {table_bytes / 2**20:8.1f} MiB  built in {table_seconds:6.2f}s")
+
+    try:
+        started = time.perf_counter()
+        arrow_table = table.to_arrow()
+        print(f"Arrow table:    {arrow_table.nbytes / 2**20:8.1f} MiB  converted in {time.perf_counter() - started:6.2f}s")
+    except ImportError as e:
+        print(f"Arrow export skipped: {e}")
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, writer, filename in (("Parquet", table.write_parquet, "results.parquet"),
+                                        ("Feather", table.write_feather, "results.feather")):
+            path = os.path.join(directory, filename)
+            started = time.perf_counter()
+            writer(path)
+            elapsed = time.perf_counter() - started
+            print(f"{label + ':':15} {os.path.getsize(path) / 2**20:8.1f} MiB  written in {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Run the offline benchmark suite and compare it against the stored baseline.
+
+    python -m benchmarks.run                     # fail on regressions
+    python -m benchmarks.run --update-baseline   # record a new baseline
+    python -m benchmarks.run --replay prod.sqlite --replay-latency recorded
+
+All upstream traffic goes to a local stub server, so no network is needed.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List
+
+from benchmarks.stats import peak_rss_mb
+from benchmarks.stub_server import StubUpstreamServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Metrics where a larger value is a regression, and where a smaller one is
+HIGHER_IS_WORSE = ("p50_ms", "p99_ms", "peak_rss_mb", "peak_session_rss_mb")
+LOWER_IS_WORSE = ("throughput",)
+
+# Below this many calls p99 is just the slowest call or two, so it is reported but not gated
+MIN_TAIL_SAMPLES = 1000
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float, min_delta_ms: float,
+            min_tail_samples: int = MIN_TAIL_SAMPLES) -> List[str]:
+    """
+    List every metric that regressed past the tolerance relative to the baseline.
+    A latency may grow by the larger of tolerance * baseline and min_delta_ms.
+    """
+    regressions = []
+    for name, metrics in baseline.items():
+        current = results.get(name)
+        if current is None:
+            continue
+        for metric, expected in metrics.items():
+            actual = current.get(metric)
+            if actual is None or not expected:
+                continue
+            if metric == "p99_ms" and current.get("calls", 0) < min_tail_samples:
+                continue
+            if metric in HIGHER_IS_WORSE:
+                # Tail latency stays noisier than the median even with enough samples
+                allowed = expected * (tolerance * 2 if metric == "p99_ms" else tolerance)
+                if metric.endswith("_ms"):
+                    allowed = max(allowed, min_delta_ms)
+                if actual > expected + allowed:
+                    regressions.append(f"{name}.{metric}: {actual:.4g} > baseline {expected:.4g}")
+            elif metric in LOWER_IS_WORSE:
+                # Gate throughput on the time per call so it gets the same floor as latencies
+                expected_ms = 1000 / expected
+                actual_ms = 1000 / actual if actual else float("inf")
+                if actual_ms > expected_ms + max(expected_ms * tolerance, min_delta_ms):
+                    regressions.append(f"{name}.{metric}: {actual:.4g} < baseline {expected:.4g}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark and load-test suite")
+    parser.add_argument("--iterations", type=int, default=200,
+                        help="Calls per micro-benchmark round; five rounds are pooled")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent simulated sessions")
+    parser.add_argument("--interactions", type=int, default=6, help="Button clicks per session")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated upstream latency")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed relative regression of p50, time per call and RSS (twice this for p99)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Always allow latency regressions up to this many milliseconds, for timer noise")
+    parser.add_argument("--min-tail-samples", type=int, default=MIN_TAIL_SAMPLES,
+                        help="Only gate p99 for benchmarks with at least this many calls")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--skip-load", action="store_true", help="Only run the micro-benchmarks")
+    parser.add_argument("--replay", metavar="STORE",
+                        help="Serve upstream responses from a recorded fixture store instead of the stub")
+    parser.add_argument("--replay-latency", default="",
+                        help="Latency model for replayed responses, e.g. recorded or lognormal:80,0.5")
+    args = parser.parse_args()
+
+    if args.replay:
+        # Set before utils/transport are imported so load-test sessions inherit it too
+        os.environ["TAMIZH_TRANSPORT"] = "replay"
+        os.environ["TAMIZH_FIXTURE_STORE"] = args.replay
+        os.environ["TAMIZH_REPLAY_LATENCY"] = args.replay_latency
+
+    server = StubUpstreamServer(latency_ms=args.latency_ms).start()
+    server.point_utils_here()
+    try:
+        from benchmarks.micro import run_micro
+        results = run_micro(args.iterations)
+        results["process"] = {"peak_rss_mb": peak_rss_mb()}
+        if not args.skip_load:
+            from benchmarks.load import run_load
+            results["load"] = run_load(args.sessions, args.interactions)
+    finally:
+        server.stop()
+
+    print(f"{'benchmark':24} {'calls':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+    for name, metrics in results.items():
+        if "calls" in metrics:
+            print(f"{name:24} {metrics['calls']:>6} {metrics['throughput']:>10.1f} "
+                  f"{metrics['p50_ms']:>9.2f} {metrics['p99_ms']:>9.2f}")
+    print(f"peak RSS: {results['process']['peak_rss_mb']:.1f} MiB", end="")
+    if "load" in results:
+        print(f" (busiest session {results['load']['peak_session_rss_mb']:.1f} MiB)", end="")
+    print(f", upstream requests served: {server.requests}")
+    if any(metrics.get("calls", args.min_tail_samples) < args.min_tail_samples for metrics in results.values()):
+        print(f"p99 is only gated for benchmarks with at least {args.min_tail_samples} calls")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline found; run with --update-baseline to create one.")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, args.min_delta_ms, args.min_tail_samples)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
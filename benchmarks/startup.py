@@ -0,0 +1,104 @@
+"""
+Startup profile: cold import time of each heavy dependency, and latency of the
+first phone lookup, map and PDF with and without the background warm-up.
+
+    python -m benchmarks.startup
+
+Every measurement runs in a fresh interpreter so nothing is already imported.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTS = [
+    "streamlit",
+    "utils",
+    "log_ingest, ip_ranges, number_blocks, phone_normalizer, warmup",
+    "pandas",
+    "folium",
+    "fpdf",
+    "geopy.geocoders",
+    "requests",
+    "phonenumbers.geocoder",
+    "phonenumbers.carrier",
+    "phonenumbers.timezone",
+]
+
+FIRST_REQUEST_STAGES = ("get_phone_info", "get_location_map", "render_map", "generate_pdf_report")
+
+
+def _fresh_python(code: str) -> str:
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return result.stdout.strip().splitlines()[-1]
+
+
+def cold_import_ms(modules: str) -> float:
+    code = (
+        "import time\n"
+        "started = time.perf_counter()\n"
+        f"import {modules}\n"
+        "print((time.perf_counter() - started) * 1000)\n"
+    )
+    return float(_fresh_python(code))
+
+
+def _first_request_worker(warm: bool):
+    """Runs inside a fresh interpreter; prints the stage timings as JSON"""
+    from benchmarks.stub_server import StubUpstreamServer
+    server = StubUpstreamServer().start()
+    server.point_utils_here()
+
+    import utils
+    timings = {}
+    if warm:
+        from warmup import warm_up
+        started = time.perf_counter()
+        warm_up()
+        timings["warm_up"] = (time.perf_counter() - started) * 1000
+
+    for attempt in ("first", "second"):
+        started = time.perf_counter()
+        phone_info = utils.get_phone_info("+919876543210")
+        timings[f"{attempt} get_phone_info"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        location_map = utils.get_location_map(phone_info)
+        timings[f"{attempt} get_location_map"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        location_map._repr_html_()
+        timings[f"{attempt} render_map"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        os.remove(utils.generate_pdf_report(phone_info, "2024-01-01 00:00:00"))
+        timings[f"{attempt} generate_pdf_report"] = (time.perf_counter() - started) * 1000
+
+    server.stop()
+    print(json.dumps(timings))
+
+
+def first_request_ms(warm: bool) -> dict:
+    code = f"from benchmarks.startup import _first_request_worker; _first_request_worker({warm})"
+    return json.loads(_fresh_python(code))
+
+
+def main():
+    print("Cold import time")
+    for modules in IMPORTS:
+        print(f"  {modules:64} {cold_import_ms(modules):8.1f} ms")
+
+    cold = first_request_ms(warm=False)
+    warm = first_request_ms(warm=True)
+    print(f"\nFirst-request latency (warm-up itself took {warm['warm_up']:.1f} ms in the background)")
+    print(f"  {'stage':24} {'cold first':>12} {'warm first':>12} {'steady state':>13}")
+    for stage in FIRST_REQUEST_STAGES:
+        print(f"  {stage:24} {cold['first ' + stage]:>9.1f} ms {warm['first ' + stage]:>9.1f} ms "
+              f"{cold['second ' + stage]:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
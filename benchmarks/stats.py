@@ -0,0 +1,35 @@
+"""
+Latency summaries and resource measurements shared by the benchmarks.
+"""
+import resource
+import sys
+from typing import Dict, List
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """
+    Throughput and p50/p99 latency for a list of per-call latencies in seconds
+    """
+    ordered = sorted(latencies)
+    return {
+        "calls": len(ordered),
+        "throughput": len(ordered) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(ordered, 0.50) * 1000,
+        "p99_ms": percentile(ordered, 0.99) * 1000,
+    }
+
+
+def peak_rss_mb(children: bool = False) -> float:
+    """Peak resident set size of this process, or of its waited-for children"""
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    divisor = 2**20 if sys.platform == "darwin" else 2**10
+    return usage.ru_maxrss / divisor
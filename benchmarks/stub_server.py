@@ -0,0 +1,113 @@
+"""
+Local stand-ins for ipapi.co and Nominatim serving recorded responses.
+
+Unknown IPs and queries get a deterministic synthetic answer so load tests
+never fall through to the network.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "upstream.json")
+
+
+def _synthetic_point(key: str):
+    """Stable pseudo-random coordinates for a key"""
+    digest = hashlib.sha1(key.encode("utf-8")).digest()
+    latitude = (int.from_bytes(digest[:4], "big") / 2**32) * 120 - 60
+    longitude = (int.from_bytes(digest[4:8], "big") / 2**32) * 360 - 180
+    return round(latitude, 4), round(longitude, 4)
+
+
+class StubUpstreamServer:
+    """Threaded HTTP server answering ipapi `/<ip>/json/` and Nominatim `/search` requests"""
+
+    def __init__(self, fixtures_path: str = FIXTURES_PATH, latency_ms: float = 0.0):
+        with open(fixtures_path, encoding="utf-8") as f:
+            self.fixtures = json.load(f)
+        self.latency_ms = latency_ms
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def ipapi_response(self, ip: str) -> dict:
+        if ip in self.fixtures["ipapi"]:
+            return self.fixtures["ipapi"][ip]
+        latitude, longitude = _synthetic_point(ip)
+        return {
+            "ip": ip, "network": None, "city": "Stub City", "region": "Stub Region",
+            "country_name": "Stubland", "postal": "00000", "latitude": latitude, "longitude": longitude,
+            "timezone": "UTC", "asn": "AS64496", "org": "STUB-NET",
+        }
+
+    def nominatim_response(self, query: str) -> list:
+        if query in self.fixtures["nominatim"]:
+            return self.fixtures["nominatim"][query]
+        latitude, longitude = _synthetic_point(query)
+        return [{
+            "lat": str(latitude), "lon": str(longitude), "display_name": query,
+            "address": {"country": query.split(",")[-1].strip(), "state": query.split(",")[0].strip()},
+        }]
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests += 1
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+
+                url = urlparse(self.path)
+                parts = [part for part in url.path.split("/") if part]
+                if parts[:1] == ["search"]:
+                    body = stub.nominatim_response(parse_qs(url.query).get("q", [""])[0])
+                elif len(parts) == 2 and parts[1] == "json":
+                    body = stub.ipapi_response(parts[0])
+                else:
+                    self.send_error(404)
+                    return
+
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubUpstreamServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def point_utils_here(self):
+        """
+        Redirect the lookup functions in utils to this server
+        """
+        import utils
+        utils.IPAPI_BASE_URL = f"http://{self.address}"
+        utils.NOMINATIM_DOMAIN = self.address
+        utils.NOMINATIM_SCHEME = "http"
+        os.environ["IPAPI_BASE_URL"] = utils.IPAPI_BASE_URL
+        os.environ["NOMINATIM_DOMAIN"] = utils.NOMINATIM_DOMAIN
+        os.environ["NOMINATIM_SCHEME"] = utils.NOMINATIM_SCHEME
@@ -0,0 +1,150 @@
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Distance at which the distance part of the score has fallen to 1/e
+DISTANCE_SCALE_KM = float(os.environ.get("TAMIZH_CORRELATION_SCALE_KM", "500"))
+
+# Share of the consistency score from distance and from timezone agreement
+DISTANCE_WEIGHT = 0.7
+TIMEZONE_WEIGHT = 0.3
+
+# Stands in for a phone or IP that was not looked up, e.g. once the lookup budget ran out
+NOT_QUERIED = {field: None for field in ("latitude", "longitude", "timezone", "city", "state", "region", "country")}
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distance in km between coordinate arrays; NaN where a coordinate is missing
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(values, dtype=np.float64))
+                              for values in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def utc_offsets(timezones: Sequence[Optional[str]], at: Optional[datetime] = None) -> np.ndarray:
+    """
+    UTC offset in minutes for each IANA timezone name, NaN for unknown names.
+    Each distinct name is resolved once, so the cost scales with the number of zones, not rows.
+    """
+    from zoneinfo import ZoneInfo
+
+    at = at or datetime.now(timezone.utc)
+    codes = {}
+    indices = np.fromiter((codes.setdefault(name, len(codes)) for name in timezones),
+                          dtype=np.int64, count=len(timezones))
+
+    offsets = np.full(len(codes), np.nan)
+    for name, code in codes.items():
+        try:
+            offsets[code] = at.astimezone(ZoneInfo(name)).utcoffset().total_seconds() / 60
+        except Exception:
+            continue
+    return offsets[indices] if len(indices) else np.empty(0)
+
+
+def consistency_scores(distance_km: np.ndarray, timezone_match: np.ndarray,
+                       timezone_known: np.ndarray) -> np.ndarray:
+    """
+    Score from 0 (inconsistent) to 100 (same place and timezone).
+    Missing coordinates or timezones drop out and the remaining part is reweighted.
+    """
+    distance_known = ~np.isnan(distance_km)
+    distance_part = np.exp(-np.where(distance_known, distance_km, 0.0) / DISTANCE_SCALE_KM)
+
+    weights = DISTANCE_WEIGHT * distance_known + TIMEZONE_WEIGHT * timezone_known
+    weighted = (DISTANCE_WEIGHT * distance_known * distance_part
+                + TIMEZONE_WEIGHT * timezone_known * timezone_match)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(weights > 0, 100 * weighted / weights, np.nan)
+
+
+def correlate_arrays(phone_lat, phone_lon, ip_lat, ip_lon,
+                     phone_timezones: Sequence[Optional[str]],
+                     ip_timezones: Sequence[Optional[str]]) -> Dict[str, np.ndarray]:
+    """
+    Distance, timezone mismatch flag and consistency score for every phone/IP pair
+    """
+    distance_km = haversine_km(phone_lat, phone_lon, ip_lat, ip_lon)
+
+    phone_offsets = utc_offsets(phone_timezones)
+    ip_offsets = utc_offsets(ip_timezones)
+    timezone_known = ~np.isnan(phone_offsets) & ~np.isnan(ip_offsets)
+    timezone_match = phone_offsets == ip_offsets
+
+    return {
+        "distance_km": distance_km,
+        "timezone_mismatch": timezone_known & ~timezone_match,
+        "consistency": consistency_scores(distance_km, timezone_match, timezone_known),
+    }
+
+
+def parse_pairs(text: str) -> List[Tuple[str, str]]:
+    """
+    Parse "phone, ip" lines (comma, tab or whitespace separated), skipping blank lines
+    """
+    pairs = []
+    for line in text.splitlines():
+        parts = line.replace(",", " ").replace("\t", " ").split()
+        if len(parts) == 2:
+            pairs.append((parts[0], parts[1]))
+    return pairs
+
+
+def _coordinate(value) -> float:
+    return float(value) if value not in (None, "", "Error") else np.nan
+
+
+def correlate_pairs(pairs: Sequence[Tuple[str, str]],
+                    phone_lookup: Optional[Callable[[str], Optional[Dict]]] = None,
+                    ip_lookup: Optional[Callable[[str], Optional[Dict]]] = None) -> List[Dict]:
+    """
+    Enrich each distinct phone number and IP once, then score every pair in one vectorized pass.
+    Values whose lookup returns None keep their row but get no location or score.
+    """
+    if phone_lookup is None or ip_lookup is None:
+        from utils import get_ip_info, get_phone_info
+        phone_lookup = phone_lookup or get_phone_info
+        ip_lookup = ip_lookup or get_ip_info
+
+    phone_infos = {number: phone_lookup(number) for number in dict.fromkeys(number for number, _ in pairs)}
+    ip_infos = {ip: ip_lookup(ip) for ip in dict.fromkeys(ip for _, ip in pairs)}
+
+    phones = [phone_infos[number] or NOT_QUERIED for number, _ in pairs]
+    ips = [ip_infos[ip] or NOT_QUERIED for _, ip in pairs]
+    scores = correlate_arrays(
+        [_coordinate(info["latitude"]) for info in phones],
+        [_coordinate(info["longitude"]) for info in phones],
+        [_coordinate(info["latitude"]) for info in ips],
+        [_coordinate(info["longitude"]) for info in ips],
+        [info["timezone"] for info in phones],
+        [info["timezone"] for info in ips],
+    )
+
+    rows = []
+    for index, ((number, ip), phone_info, ip_info) in enumerate(zip(pairs, phones, ips)):
+        distance = scores["distance_km"][index]
+        consistency = scores["consistency"][index]
+        rows.append({
+            "phone": number,
+            "ip": ip,
+            "phone_location": ", ".join(part for part in (phone_info["city"], phone_info["state"], phone_info["country"])
+                                        if part and part not in ("Unknown", "Error")),
+            "ip_location": ", ".join(part for part in (ip_info["city"], ip_info["region"], ip_info["country"])
+                                     if part and part not in ("Unknown", "Error")),
+            "distance_km": None if np.isnan(distance) else round(float(distance), 1),
+            "phone_timezone": phone_info["timezone"],
+            "ip_timezone": ip_info["timezone"],
+            "timezone_mismatch": bool(scores["timezone_mismatch"][index]),
+            "consistency": None if np.isnan(consistency) else round(float(consistency), 1),
+            "phone_latitude": phone_info["latitude"],
+            "phone_longitude": phone_info["longitude"],
+            "ip_latitude": ip_info["latitude"],
+            "ip_longitude": ip_info["longitude"],
+        })
+    return rows
@@ -0,0 +1,180 @@
+import argparse
+import csv
+import io
+import json
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, fields
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from results import IPResult, PhoneResult, Result
+
+# Bytes buffered before a chunk is yielded
+CHUNK_SIZE = 64 * 1024
+
+# Coordinates are not repeated in feature properties
+COORDINATE_FIELDS = ("latitude", "longitude")
+
+
+def _field_names(record_type: type) -> List[str]:
+    return [field.name for field in fields(record_type)]
+
+
+def _chunked(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Join small text pieces into UTF-8 chunks of roughly chunk_size bytes"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def _has_point(record: Result) -> bool:
+    return record.latitude is not None and record.longitude is not None
+
+
+def export_csv(records: Iterable[Result], record_type: type = PhoneResult,
+               chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream records as CSV with a header row, in dataclass field order
+    """
+    names = _field_names(record_type)
+
+    def pieces():
+        line = io.StringIO()
+        writer = csv.writer(line, lineterminator="\n")
+        writer.writerow(names)
+        for record in records:
+            writer.writerow(["" if value is None else value
+                             for value in (getattr(record, name) for name in names)])
+            yield line.getvalue()
+            line.seek(0)
+            line.truncate()
+        yield line.getvalue()
+
+    return _chunked(pieces(), chunk_size)
+
+
+def export_geojson(records: Iterable[Result], record_type: type = PhoneResult,
+                   chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream records as a GeoJSON FeatureCollection; records without coordinates get a null geometry
+    """
+    def pieces():
+        yield '{"type":"FeatureCollection","features":['
+        separator = "\n"
+        for record in records:
+            properties = {key: value for key, value in asdict(record).items() if key not in COORDINATE_FIELDS}
+            geometry = ({"type": "Point", "coordinates": [record.longitude, record.latitude]}
+                        if _has_point(record) else None)
+            feature = {"type": "Feature", "geometry": geometry, "properties": properties}
+            yield separator + json.dumps(feature, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+            separator = ",\n"
+        yield "\n]}\n"
+
+    return _chunked(pieces(), chunk_size)
+
+
+def _placemark_name(record: Result) -> str:
+    if isinstance(record, IPResult):
+        return record.ip
+    return record.formatted_number or ""
+
+
+def export_kml(records: Iterable[Result], record_type: type = PhoneResult,
+               chunk_size: int = CHUNK_SIZE, document_name: str = "Tamizh lookups") -> Iterator[bytes]:
+    """
+    Stream records as KML placemarks with every field in ExtendedData
+    """
+    names = [name for name in _field_names(record_type) if name not in COORDINATE_FIELDS]
+
+    def pieces():
+        yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+               '<kml xmlns="http://www.opengis.net/kml/2.2">\n'
+               f'<Document><name>{escape(document_name)}</name>\n')
+        for record in records:
+            data = "".join(
+                f'<Data name="{name}"><value>{escape(str(value))}</value></Data>'
+                for name, value in ((name, getattr(record, name)) for name in names)
+                if value is not None
+            )
+            point = (f"<Point><coordinates>{record.longitude!r},{record.latitude!r}</coordinates></Point>"
+                     if _has_point(record) else "")
+            yield (f"<Placemark><name>{escape(_placemark_name(record))}</name>"
+                   f"<ExtendedData>{data}</ExtendedData>{point}</Placemark>\n")
+        yield "</Document>\n</kml>\n"
+
+    return _chunked(pieces(), chunk_size)
+
+
+# Format name: (exporter, MIME type, file extension)
+EXPORT_FORMATS: Dict[str, Tuple[Callable[..., Iterator[bytes]], str, str]] = {
+    "csv": (export_csv, "text/csv", ".csv"),
+    "geojson": (export_geojson, "application/geo+json", ".geojson"),
+    "kml": (export_kml, "application/vnd.google-earth.kml+xml", ".kml"),
+}
+
+RECORD_TYPES = {"phone": PhoneResult, "ip": IPResult}
+
+
+def lookup_records(values: Iterable[str], kind: str, max_workers: int = 4,
+                   lookup: Optional[Callable[[str], Dict]] = None) -> Iterator[Result]:
+    """
+    Look values up concurrently and yield typed records in input order,
+    keeping at most a small window of lookups in flight
+    """
+    if lookup is None:
+        from utils import get_ip_info, get_phone_info
+        lookup = get_phone_info if kind == "phone" else get_ip_info
+    record_type = RECORD_TYPES[kind]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for value in values:
+            pending.append(executor.submit(lookup, value))
+            if len(pending) >= max_workers * 2:
+                yield record_type.from_info(pending.popleft().result())
+        while pending:
+            yield record_type.from_info(pending.popleft().result())
+
+
+def export(records: Iterable[Result], export_format: str, kind: str = "phone",
+           chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Stream records in one of EXPORT_FORMATS
+    """
+    exporter = EXPORT_FORMATS[export_format][0]
+    return exporter(records, RECORD_TYPES[kind], chunk_size=chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up phone numbers or IPs and stream them out for GIS tools")
+    parser.add_argument("kind", choices=sorted(RECORD_TYPES), help="What the input lines contain")
+    parser.add_argument("path", nargs="?", default="-", help="File with one value per line, or - for stdin")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="geojson")
+    parser.add_argument("--output", "-o", default="-", help="Output file, or - for stdout")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent lookups")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    target = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        values = (line.strip() for line in source if line.strip())
+        for chunk in export(lookup_records(values, args.kind, args.workers), args.format, args.kind):
+            target.write(chunk)
+            target.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout.buffer:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
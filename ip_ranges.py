@@ -0,0 +1,166 @@
+import bisect
+import ipaddress
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from utils import get_ip_info
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+# Granularity assumed when the provider does not report its network boundary
+DEFAULT_PREFIX = {4: 24, 6: 48}
+
+# Fields that must match for neighbouring sub-ranges to be merged
+SUMMARY_FIELDS = ("country", "region", "city", "asn", "org", "latitude", "longitude")
+
+
+def parse_ip_range(text: str) -> Tuple[int, int, int]:
+    """
+    Parse a CIDR, a start-end range or a single address into (version, first, last)
+    """
+    text = text.strip()
+    if "-" in text:
+        start_text, end_text = (part.strip() for part in text.split("-", 1))
+        start = ipaddress.ip_address(start_text)
+        end = ipaddress.ip_address(end_text)
+        if start.version != end.version:
+            raise ValueError(f"Mixed IP versions in range: {text}")
+        if int(start) > int(end):
+            raise ValueError(f"Range start is after range end: {text}")
+        return start.version, int(start), int(end)
+
+    network = ipaddress.ip_network(text, strict=False)
+    return network.version, int(network.network_address), int(network.broadcast_address)
+
+
+def format_ip_range(version: int, first: int, last: int) -> str:
+    """
+    Format a range as CIDR blocks when that is compact, otherwise as start - end
+    """
+    address = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+    blocks = list(ipaddress.summarize_address_range(address(first), address(last)))
+    if len(blocks) <= 2:
+        return ", ".join(str(block) for block in blocks)
+    return f"{address(first)} - {address(last)}"
+
+
+def _provider_network(ip_info: Dict[str, str], ip: Union[ipaddress.IPv4Address, ipaddress.IPv6Address]) -> IPNetwork:
+    """Network boundary reported by the provider, or the default block around the IP"""
+    if ip_info.get("network"):
+        try:
+            network = ipaddress.ip_network(ip_info["network"], strict=False)
+            if ip in network:
+                return network
+        except ValueError:
+            pass
+    return ipaddress.ip_network(f"{ip}/{DEFAULT_PREFIX[ip.version]}", strict=False)
+
+
+class _NetworkIndex:
+    """Sorted, non-overlapping provider networks already looked up"""
+
+    def __init__(self):
+        self._starts = {4: [], 6: []}
+        self._entries = {4: [], 6: []}
+
+    def find(self, version: int, value: int) -> Optional[Tuple[int, int, Dict[str, str]]]:
+        starts = self._starts[version]
+        pos = bisect.bisect_right(starts, value) - 1
+        if pos >= 0:
+            entry = self._entries[version][pos]
+            if entry[0] <= value <= entry[1]:
+                return entry
+        return None
+
+    def add(self, version: int, first: int, last: int, ip_info: Dict[str, str]) -> Tuple[int, int, Dict[str, str]]:
+        """Insert a network, clipped so it never overlaps a known one"""
+        starts = self._starts[version]
+        entries = self._entries[version]
+        pos = bisect.bisect_left(starts, first)
+        if pos > 0:
+            first = max(first, entries[pos - 1][1] + 1)
+        if pos < len(starts):
+            last = min(last, starts[pos] - 1)
+
+        entry = (first, last, ip_info)
+        starts.insert(pos, first)
+        entries.insert(pos, entry)
+        return entry
+
+
+def _summary_row(query: str, version: int, first: int, last: int, ip_info: Optional[Dict[str, str]]) -> Dict:
+    row = {
+        "query": query,
+        "version": version,
+        "first": first,
+        "last": last,
+        "addresses": last - first + 1,
+        "provider_network": ip_info.get("network") if ip_info else None,
+    }
+    for field in SUMMARY_FIELDS:
+        row[field] = ip_info[field] if ip_info else "Not queried"
+    row["status"] = "ok" if ip_info and ip_info["country"] != "Error" else ("error" if ip_info else "skipped")
+    return row
+
+
+def analyse_ip_ranges(ranges: List[str], max_queries: int = 256,
+                      lookup: Callable[[str], Optional[Dict[str, str]]] = get_ip_info) -> List[Dict]:
+    """
+    Summarise whole IP ranges with one lookup per distinct provider sub-range.
+    A lookup that returns None ends querying and the rest is reported as skipped.
+    """
+    index = _NetworkIndex()
+    queries = 0
+    rows = []
+
+    for query in ranges:
+        version, first, last = parse_ip_range(query)
+        address = ipaddress.IPv4Address if version == 4 else ipaddress.IPv6Address
+        cursor = first
+
+        while cursor <= last:
+            entry = index.find(version, cursor)
+            if entry is None:
+                if queries >= max_queries:
+                    rows.append(_summary_row(query, version, cursor, last, None))
+                    break
+
+                ip = address(cursor)
+                ip_info = lookup(str(ip))
+                if ip_info is None:
+                    max_queries = queries
+                    rows.append(_summary_row(query, version, cursor, last, None))
+                    break
+                queries += 1
+                network = _provider_network(ip_info, ip)
+                entry = index.add(version, max(int(network.network_address), cursor),
+                                  int(network.broadcast_address), ip_info)
+
+            sub_last = min(last, entry[1])
+            rows.append(_summary_row(query, version, cursor, sub_last, entry[2]))
+            cursor = sub_last + 1
+
+    return merge_adjacent_ranges(rows)
+
+
+def merge_adjacent_ranges(rows: List[Dict]) -> List[Dict]:
+    """
+    Merge contiguous sub-ranges of the same query that share every summary field
+    """
+    merged = []
+    for row in rows:
+        previous = merged[-1] if merged else None
+        if (previous is not None
+                and previous["query"] == row["query"]
+                and previous["status"] == row["status"]
+                and previous["last"] + 1 == row["first"]
+                and all(previous[field] == row[field] for field in SUMMARY_FIELDS)):
+            previous["last"] = row["last"]
+            previous["addresses"] += row["addresses"]
+            if previous["provider_network"] != row["provider_network"]:
+                previous["provider_network"] = None
+            continue
+        merged.append(dict(row))
+
+    for row in merged:
+        row["sub_range"] = format_ip_range(row["version"], row["first"], row["last"])
+    return merged
@@ -0,0 +1,248 @@
+import argparse
+import ipaddress
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from utils import get_ip_info
+
+# Precompiled scanner for IPv4/IPv6 candidates. Candidates are confirmed with
+# the ipaddress module so timestamps like "12:30:45" are discarded.
+_IPV4_OCTETS = (
+    r"(?:(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)\.){3}"
+    r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+)
+_IPV4_PATTERN = rf"(?<![\d.]){_IPV4_OCTETS}(?![\d.])"
+# IPv6, including forms ending in a dotted quad such as ::ffff:192.0.2.1
+_IPV6_PATTERN = (
+    r"(?<![0-9A-Fa-f:])"
+    r"(?:[0-9A-Fa-f]{0,4}:){2,7}"
+    rf"(?:{_IPV4_OCTETS}(?![\d.])|[0-9A-Fa-f]{{0,4}}(?![0-9A-Fa-f:]|\.\d))"
+)
+IP_PATTERN = re.compile(f"{_IPV4_PATTERN}|{_IPV6_PATTERN}")
+
+# Directory the app may stream logs from; relative paths are taken from here
+LOG_DIR = os.environ.get("TAMIZH_LOG_DIR", "/var/log/nginx")
+
+
+def extract_ips(line: str, public_only: bool = True) -> List[str]:
+    """
+    Extract the IPv4/IPv6 addresses found in a single log line
+    """
+    # Cheap pre-check before running the regex
+    if "." not in line and ":" not in line:
+        return []
+
+    ips = []
+    for match in IP_PATTERN.finditer(line):
+        try:
+            ip = ipaddress.ip_address(match.group(0))
+        except ValueError:
+            continue
+        # Report IPv4-mapped IPv6 as plain IPv4 so both spellings dedup and enrich alike
+        if ip.version == 6 and ip.ipv4_mapped is not None:
+            ip = ip.ipv4_mapped
+        if public_only and not ip.is_global:
+            continue
+        ips.append(ip.compressed)
+    return ips
+
+
+class SlidingWindowSet:
+    """Bounded set remembering the most recently seen keys"""
+
+    def __init__(self, capacity: int = 100_000):
+        self.capacity = capacity
+        self._keys = OrderedDict()
+
+    def add(self, key: str) -> bool:
+        """Add a key, returning True if it was not already in the window"""
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            return False
+        self._keys[key] = None
+        if len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+def resolve_log_path(path: str, log_dir: str = LOG_DIR) -> str:
+    """
+    Resolve a requested log path, following symlinks, and reject it unless it is inside log_dir
+    """
+    root = os.path.realpath(log_dir)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"Log files must be inside {log_dir}")
+    return resolved
+
+
+def follow_file(path: str, follow: bool = True, poll_interval: float = 0.5,
+                from_start: bool = True) -> Iterator[str]:
+    """
+    Read a log file line by line, optionally tailing it like `tail -F`.
+    An empty string is yielded on every idle poll so consumers can refresh.
+    """
+    handle = open(path, "r", encoding="utf-8", errors="replace")
+    try:
+        if not from_start:
+            handle.seek(0, os.SEEK_END)
+        inode = os.fstat(handle.fileno()).st_ino
+
+        while True:
+            line = handle.readline()
+            if line:
+                yield line
+                continue
+            if not follow:
+                return
+
+            yield ""
+            time.sleep(poll_interval)
+
+            # Reopen on rotation, rewind on truncation
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if stat.st_ino != inode:
+                handle.close()
+                handle = open(path, "r", encoding="utf-8", errors="replace")
+                inode = stat.st_ino
+            elif stat.st_size < handle.tell():
+                handle.seek(0)
+    finally:
+        handle.close()
+
+
+def read_stream(stream: TextIO) -> Iterator[str]:
+    """
+    Read lines from an already open stream such as stdin
+    """
+    for line in stream:
+        yield line
+
+
+class IngestStats:
+    """Running aggregates for the live dashboard, bounded in size"""
+
+    def __init__(self, max_points: int = 2000):
+        self.lines = 0
+        self.ips_seen = 0
+        self.lookups = 0
+        self.errors = 0
+        self.countries = Counter()
+        self.asns = Counter()
+        self.points = deque(maxlen=max_points)
+
+    def add_result(self, ip_info: Dict[str, str]):
+        """Fold one enriched IP into the aggregates"""
+        self.lookups += 1
+        if ip_info["country"] == "Error":
+            self.errors += 1
+            return
+
+        self.countries[ip_info["country"]] += 1
+        asn = ip_info["asn"]
+        if ip_info["org"] not in ("Unknown", asn):
+            asn = f"{asn} ({ip_info['org']})"
+        self.asns[asn] += 1
+
+        if ip_info["latitude"] and ip_info["longitude"]:
+            self.points.append(ip_info)
+
+
+def enrich_stream(lines: Iterable[str], stats: Optional[IngestStats] = None,
+                  max_workers: int = 4, max_pending: int = 32,
+                  window: int = 100_000, public_only: bool = True,
+                  lookup: Callable[[str], Dict[str, str]] = get_ip_info) -> Iterator[Optional[Dict[str, str]]]:
+    """
+    Scan log lines for IPs and enrich only unseen ones through a bounded worker pool.
+    Yields each enriched result, and None on idle ticks of the input.
+    """
+    if stats is None:
+        stats = IngestStats()
+    seen = SlidingWindowSet(window)
+    pending = set()
+
+    def harvest(block: bool):
+        if not pending:
+            return []
+        done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        results = []
+        for future in done:
+            pending.discard(future)
+            result = future.result()
+            stats.add_result(result)
+            results.append(result)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for line in lines:
+            if not line:
+                yield from harvest(block=False)
+                yield None
+                continue
+
+            stats.lines += 1
+            for ip in extract_ips(line, public_only):
+                stats.ips_seen += 1
+                if not seen.add(ip):
+                    continue
+
+                # Apply backpressure instead of queueing unbounded work
+                while len(pending) >= max_pending:
+                    yield from harvest(block=True)
+                pending.add(executor.submit(lookup, ip))
+
+            yield from harvest(block=False)
+
+        while pending:
+            yield from harvest(block=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geolocate the IP addresses found in an access log")
+    parser.add_argument("path", nargs="?", default="-", help="Log file to read, or - for stdin")
+    parser.add_argument("--follow", action="store_true", help="Keep tailing the file for new lines")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent lookups")
+    parser.add_argument("--window", type=int, default=100_000, help="Dedup window size")
+    parser.add_argument("--top", type=int, default=10, help="Rows in the final summary")
+    args = parser.parse_args()
+
+    if args.path == "-":
+        lines = read_stream(sys.stdin)
+    else:
+        lines = follow_file(args.path, follow=args.follow)
+
+    stats = IngestStats()
+    try:
+        for result in enrich_stream(lines, stats, max_workers=args.workers, window=args.window):
+            if result is not None:
+                print(json.dumps(result), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+    print(f"\nLines: {stats.lines}  IPs: {stats.ips_seen}  Lookups: {stats.lookups}  Errors: {stats.errors}",
+          file=sys.stderr)
+    print("Top countries:", file=sys.stderr)
+    for country, count in stats.countries.most_common(args.top):
+        print(f"  {country}: {count}", file=sys.stderr)
+    print("Top ASNs:", file=sys.stderr)
+    for asn, count in stats.asns.most_common(args.top):
+        print(f"  {asn}: {count}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
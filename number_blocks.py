@@ -0,0 +1,217 @@
+import importlib
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import phonenumbers
+
+from results import NUMBER_TYPES
+
+# Prefix datasets walked for every block, keyed by the attribute they provide.
+# They are large, so they are only imported on the first block analysis.
+PREFIX_DATASETS = {
+    "carrier": ("phonenumbers.carrierdata", "CARRIER_DATA"),
+    "geo": ("phonenumbers.geodata", "GEOCODE_DATA"),
+    "timezone": ("phonenumbers.tzdata", "TIMEZONE_DATA"),
+}
+
+# Wildcard characters accepted in block patterns such as "+91 98XXXXXXXX"
+WILDCARD_PATTERN = re.compile(r"[Xx?*#]")
+
+# Digit fills used to sample validity inside each sub-prefix
+SAMPLE_FILLS = ("0", "5", "9", "1234567890")
+
+
+def parse_number_block(pattern: str, national_length: Optional[int] = None,
+                       country_code: Optional[str] = None) -> Tuple[int, str, int]:
+    """
+    Parse a block pattern into (country calling code, E.164 digit prefix, total E.164 digits)
+    """
+    text = re.sub(r"[\s\-().]", "", pattern)
+    if text.startswith("00"):
+        text = "+" + text[2:]
+    if not text.startswith("+"):
+        if not country_code:
+            raise ValueError("Block must start with + or 00, or a country code must be selected")
+        text = f"+{country_code}{text}"
+    text = text[1:]
+
+    wildcards = WILDCARD_PATTERN.search(text)
+    prefix = text[:wildcards.start()] if wildcards else text
+    if not prefix.isdigit() or (wildcards and WILDCARD_PATTERN.sub("", text[wildcards.start():])):
+        raise ValueError(f"Unsupported block pattern: {pattern}")
+
+    for length in range(1, min(len(prefix), 3) + 1):
+        code = int(prefix[:length])
+        if code in phonenumbers.COUNTRY_CODE_TO_REGION_CODE:
+            break
+    else:
+        raise ValueError(f"Unknown country calling code in: {pattern}")
+    code_digits = len(str(code))
+
+    if wildcards:
+        total_length = len(text)
+    elif national_length:
+        total_length = code_digits + national_length
+    else:
+        # Default to the longest mobile number length of the main region
+        region = phonenumbers.region_code_for_country_code(code)
+        metadata = phonenumbers.PhoneMetadata.metadata_for_region_or_calling_code(code, region)
+        lengths = metadata.mobile.possible_length or metadata.general_desc.possible_length
+        total_length = code_digits + max(lengths)
+
+    if total_length < len(prefix):
+        raise ValueError(f"Prefix is longer than the number length in: {pattern}")
+    return code, prefix, total_length
+
+
+@lru_cache(maxsize=64)
+def _prefix_index(code: int) -> Tuple[Dict[str, Dict[str, str]], frozenset]:
+    """
+    Attribute entries and branch points of every prefix dataset for one calling code
+    """
+    code_text = str(code)
+    entries = defaultdict(dict)
+    branches = set()
+    for attribute, (module_name, variable) in PREFIX_DATASETS.items():
+        data = getattr(importlib.import_module(module_name), variable)
+        for key, value in data.items():
+            if not key.startswith(code_text):
+                continue
+            if attribute == "timezone":
+                entries[key][attribute] = ", ".join(value)
+            else:
+                entries[key][attribute] = value.get("en", "")
+            for end in range(len(code_text), len(key)):
+                branches.add(key[:end])
+    return dict(entries), frozenset(branches)
+
+
+def _number_for(code: int, digits: str) -> phonenumbers.PhoneNumber:
+    """Build a PhoneNumber from E.164 digits without going through the parser"""
+    national = digits[len(str(code)):]
+    numobj = phonenumbers.PhoneNumber(country_code=code, national_number=int(national or "0"))
+    leading_zeros = len(national) - len(national.lstrip("0"))
+    if leading_zeros and len(national) > 1:
+        numobj.italian_leading_zero = True
+        numobj.number_of_leading_zeros = min(leading_zeros, len(national) - 1)
+    return numobj
+
+
+def _sample_leaf(code: int, prefix: str, total_length: int) -> Tuple[float, str, str]:
+    """
+    Estimate the valid share of a sub-prefix from a few filled-in sample numbers
+    """
+    from phonenumbers import geocoder
+    rest = total_length - len(prefix)
+    valid = 0
+    number_type = None
+    country = ""
+    for fill in SAMPLE_FILLS:
+        numobj = _number_for(code, prefix + (fill * rest)[:rest])
+        if phonenumbers.is_valid_number(numobj):
+            valid += 1
+            if number_type is None:
+                number_type = NUMBER_TYPES.get(phonenumbers.number_type(numobj), "UNKNOWN")
+                country = geocoder.country_name_for_number(numobj, "en")
+    return valid / len(SAMPLE_FILLS), number_type or "INVALID", country
+
+
+def analyse_number_block(pattern: str, national_length: Optional[int] = None,
+                         country_code: Optional[str] = None) -> Dict:
+    """
+    Characterise every number in a block by walking the phonenumbers prefix metadata.
+    Numbers are never enumerated: each row is a sub-prefix with uniform attributes.
+    """
+    code, prefix, total_length = parse_number_block(pattern, national_length, country_code)
+    entries, branches = _prefix_index(code)
+
+    from phonenumbers import geocoder
+    example = phonenumbers.example_number(phonenumbers.region_code_for_country_code(code))
+    default_country = geocoder.country_name_for_number(example, "en") if example else ""
+
+    # Attributes inherited from the longest dataset keys covering the prefix
+    inherited = {}
+    for end in range(len(str(code)), len(prefix) + 1):
+        inherited.update(entries.get(prefix[:end], {}))
+
+    leaves = []
+
+    def walk(current: str, attributes: Dict[str, str]):
+        if current != prefix and current in entries:
+            attributes = {**attributes, **entries[current]}
+        if current not in branches or len(current) >= total_length:
+            leaves.append((current, attributes))
+            return
+        for digit in "0123456789":
+            walk(current + digit, attributes)
+
+    walk(prefix, inherited)
+
+    rows = []
+    for leaf, attributes in leaves:
+        valid_share, number_type, country = _sample_leaf(code, leaf, total_length)
+        row = {
+            "parent": leaf[:-1] if leaf != prefix else leaf,
+            "first_digit": leaf[-1] if leaf != prefix else "",
+            "last_digit": leaf[-1] if leaf != prefix else "",
+            "numbers": 10 ** (total_length - len(leaf)),
+            "valid_share": valid_share,
+            "number_type": number_type,
+            "carrier": attributes.get("carrier") or "Unknown",
+            "geo": attributes.get("geo") or country or default_country or "Unknown",
+            "timezone": attributes.get("timezone") or "Unknown",
+        }
+
+        # Merge with the previous sibling when nothing but the last digit differs
+        previous = rows[-1] if rows else None
+        if (previous is not None and row["first_digit"]
+                and previous["parent"] == row["parent"]
+                and previous["last_digit"]
+                and int(previous["last_digit"]) + 1 == int(row["first_digit"])
+                and all(previous[key] == row[key]
+                        for key in ("numbers", "valid_share", "number_type", "carrier", "geo", "timezone"))):
+            previous["last_digit"] = row["last_digit"]
+            previous["block_numbers"] += row["numbers"]
+            continue
+
+        row["block_numbers"] = row["numbers"]
+        rows.append(row)
+
+    summary_rows = []
+    for row in rows:
+        digits = row["first_digit"] if row["first_digit"] == row["last_digit"] else \
+            f"[{row['first_digit']}-{row['last_digit']}]"
+        wildcard_count = total_length - len(row["parent"]) - (1 if row["first_digit"] else 0)
+        summary_rows.append({
+            "sub_prefix": f"+{row['parent']}{digits}" + "X" * wildcard_count,
+            "numbers": row["block_numbers"],
+            "estimated_valid": int(row["block_numbers"] * row["valid_share"]),
+            "number_type": row["number_type"],
+            "carrier": row["carrier"],
+            "geo": row["geo"],
+            "timezone": row["timezone"],
+        })
+
+    return {
+        "pattern": f"+{prefix}" + "X" * (total_length - len(prefix)),
+        "country_code": code,
+        "total_numbers": 10 ** (total_length - len(prefix)),
+        "rows": summary_rows,
+        "by_carrier": _aggregate(summary_rows, "carrier"),
+        "by_geo": _aggregate(summary_rows, "geo"),
+        "by_timezone": _aggregate(summary_rows, "timezone"),
+    }
+
+
+def _aggregate(rows: List[Dict], field: str) -> List[Dict]:
+    """Total numbers and estimated valid numbers per value of one field"""
+    totals = defaultdict(lambda: [0, 0])
+    for row in rows:
+        totals[row[field]][0] += row["numbers"]
+        totals[row[field]][1] += row["estimated_valid"]
+    return [
+        {field: value, "numbers": numbers, "estimated_valid": valid}
+        for value, (numbers, valid) in sorted(totals.items(), key=lambda item: -item[1][0])
+    ]
@@ -0,0 +1,212 @@
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import phonenumbers
+
+# Access prefixes tried when the default region's own one does not match
+COMMON_INTERNATIONAL_PREFIXES = ("00", "011")
+
+# Names in the UI country table that differ from the phonenumbers display names
+REGION_ALIASES = {
+    "USA": "US",
+    "UK": "GB",
+    "UAE": "AE",
+    "Palestine": "PS",
+}
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+class PrefixTrie:
+    """Digit trie answering longest-prefix queries in O(length)"""
+
+    __slots__ = ("_root",)
+
+    def __init__(self):
+        self._root = {}
+
+    def insert(self, prefix: str, value):
+        node = self._root
+        for digit in prefix:
+            node = node.setdefault(digit, {})
+        node[None] = value
+
+    def longest_match(self, digits: str, start: int = 0) -> Tuple[int, object]:
+        """Return (length, value) of the longest stored prefix of digits[start:]"""
+        node = self._root
+        best = (0, None)
+        for position in range(start, len(digits)):
+            node = node.get(digits[position])
+            if node is None:
+                break
+            if None in node:
+                best = (position - start + 1, node[None])
+        return best
+
+
+def _literal_prefix(pattern: Optional[str]) -> Optional[str]:
+    """Access/trunk prefixes are stored as regexes; keep only plain digit ones"""
+    return pattern if pattern and pattern.isdigit() else None
+
+
+@lru_cache(maxsize=None)
+def _tries() -> Tuple[PrefixTrie, Dict[str, Tuple[Optional[str], Optional[str]]], PrefixTrie]:
+    """
+    Build the calling-code trie, the per-region (international prefix, trunk prefix) table
+    and the trie of common access prefixes, once, on first use
+    """
+    calling_codes = PrefixTrie()
+    for code, regions in phonenumbers.COUNTRY_CODE_TO_REGION_CODE.items():
+        calling_codes.insert(str(code), (code, regions))
+
+    dialing_prefixes = {}
+    for region in phonenumbers.SUPPORTED_REGIONS:
+        metadata = phonenumbers.PhoneMetadata.metadata_for_region(region)
+        international = (_literal_prefix(metadata.international_prefix)
+                         or _literal_prefix(metadata.preferred_international_prefix))
+        dialing_prefixes[region] = (international, _literal_prefix(metadata.national_prefix))
+
+    common_prefixes = PrefixTrie()
+    for prefix in COMMON_INTERNATIONAL_PREFIXES:
+        common_prefixes.insert(prefix, prefix)
+    return calling_codes, dialing_prefixes, common_prefixes
+
+
+def region_for_country(country: str, code: str) -> Optional[str]:
+    """
+    Resolve a UI country name and calling code to an ISO region, even for shared codes
+    """
+    if country in REGION_ALIASES:
+        return REGION_ALIASES[country]
+    regions = phonenumbers.COUNTRY_CODE_TO_REGION_CODE.get(int(code), ())
+    if len(regions) <= 1:
+        return regions[0] if regions else None
+
+    from phonenumbers import geocoder
+    for region in regions:
+        example = phonenumbers.example_number(region)
+        if example and geocoder.country_name_for_number(example, "en") == country:
+            return region
+    return regions[0] if regions else None
+
+
+def _fits_length(code: int, national: str) -> bool:
+    """Whether a national number has a possible length for any region of a calling code"""
+    for region in phonenumbers.COUNTRY_CODE_TO_REGION_CODE.get(code, ()):
+        metadata = phonenumbers.PhoneMetadata.metadata_for_region_or_calling_code(code, region)
+        if metadata and len(national) in metadata.general_desc.possible_length:
+            return True
+    return False
+
+
+def normalize_number(raw: str, default_region: Optional[str] = None, access_prefix: bool = True) -> Dict:
+    """
+    Normalise a pasted number in any common format and infer its region;
+    access_prefix=False reads a leading "00"/"011" as national digits instead
+    """
+    result = {
+        "input": raw,
+        "e164": None,
+        "country_code": None,
+        "region": None,
+        "candidates": "",
+        "ambiguous": False,
+        "is_valid": False,
+        "method": None,
+        "error": None,
+    }
+
+    calling_code_trie, dialing_prefixes, common_prefix_trie = _tries()
+    text = raw.strip()
+    digits = _NON_DIGITS.sub("", text)
+    if not digits:
+        result["error"] = "No digits found"
+        return result
+
+    start = 0
+    method = None
+    if text.startswith("+"):
+        method = "international"
+    elif access_prefix:
+        # International access prefix of the default region, then a common one
+        international = dialing_prefixes.get(default_region, (None, None))[0]
+        if international and digits.startswith(international):
+            start, method = len(international), "access_prefix"
+        else:
+            length, _ = common_prefix_trie.longest_match(digits)
+            if length and default_region:
+                # A foreign prefix is a guess; a valid national number of the region wins
+                national_result = normalize_number(raw, default_region, access_prefix=False)
+                if national_result["is_valid"]:
+                    return national_result
+            if length:
+                start, method = length, "access_prefix"
+
+    code = None
+    regions = ()
+    if method:
+        length, match = calling_code_trie.longest_match(digits, start)
+        if match:
+            code, regions = match
+            national = digits[start + length:]
+    else:
+        trunk = dialing_prefixes.get(default_region, (None, None))[1]
+        national = digits
+        if default_region and trunk and digits.startswith(trunk):
+            national, method = digits[len(trunk):], "trunk_prefix"
+        elif default_region:
+            method = "national"
+        if method:
+            code = phonenumbers.country_code_for_region(default_region)
+            regions = phonenumbers.COUNTRY_CODE_TO_REGION_CODE.get(code, ())
+            if method == "national" and not _fits_length(code, national):
+                method, code = None, None
+
+        if method is None:
+            # Last resort: international number typed without "+"
+            length, match = calling_code_trie.longest_match(digits)
+            if match and _fits_length(match[0], digits[length:]):
+                code, regions = match
+                national, method = digits[length:], "assumed_international"
+
+    if code is None:
+        result["error"] = "Could not determine the country calling code"
+        return result
+
+    result["country_code"] = code
+    result["candidates"] = ", ".join(regions)
+    result["method"] = method
+    try:
+        parsed = phonenumbers.parse(f"+{code}{national}")
+    except phonenumbers.NumberParseException as e:
+        result["error"] = str(e)
+        result["ambiguous"] = len(regions) > 1
+        return result
+
+    result["e164"] = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.E164)
+    result["is_valid"] = phonenumbers.is_valid_number(parsed)
+    if not result["is_valid"] and method == "national":
+        # "91..." may be an international number typed without "+"
+        international = normalize_number(f"+{digits}")
+        if international["is_valid"]:
+            international.update(input=raw, method="assumed_international")
+            return international
+    if not result["is_valid"] and method == "access_prefix" and default_region:
+        # "00..." may still be a trunk-prefixed national number of the default region
+        national_result = normalize_number(raw, default_region, access_prefix=False)
+        if national_result["is_valid"]:
+            return national_result
+
+    result["region"] = phonenumbers.region_code_for_number(parsed) if result["is_valid"] else None
+    if result["region"] is None and len(regions) == 1:
+        result["region"] = regions[0]
+    result["ambiguous"] = result["region"] is None and len(regions) > 1
+    return result
+
+
+def normalize_numbers(raw_numbers: Iterable[str], default_region: Optional[str] = None) -> List[Dict]:
+    """
+    Normalise a batch of pasted numbers, skipping blank lines
+    """
+    return [normalize_number(raw, default_region) for raw in raw_numbers if raw.strip()]
@@ -0,0 +1,340 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+ARCHIVE_PATH = os.environ.get("TAMIZH_REPORT_ARCHIVE", "report_archive.sqlite")
+ARCHIVE_ENABLED = os.environ.get("TAMIZH_ARCHIVE_REPORTS", "1") != "0"
+
+# "auto" uses zstd when the zstandard package is installed and zlib otherwise
+ARCHIVE_CODEC = os.environ.get("TAMIZH_ARCHIVE_CODEC", "auto")
+
+REPORT_KINDS = ("phone", "ip")
+REPORT_FORMATS = ("text", "pdf")
+
+# zlib can only reference the last 32 KiB of a preset dictionary
+MAX_DICTIONARY_BYTES = 32 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Reports inserted per transaction by add_many
+BATCH_SIZE = 1000
+
+_METADATA_COLUMNS = ("id", "created_at", "kind", "format", "subject", "country", "carrier",
+                     "raw_size", "stored_size")
+
+
+def _available_codec(preferred: str = ARCHIVE_CODEC) -> str:
+    if preferred in ("auto", "zstd"):
+        try:
+            import zstandard  # noqa: F401
+            return "zstd"
+        except ImportError:
+            if preferred == "zstd":
+                raise ImportError("zstandard is required for the zstd archive codec")
+    return "zlib"
+
+
+def normalize_subject(kind: str, subject: str) -> str:
+    """Phone numbers are indexed as +digits so formatting differences still match"""
+    if kind == "phone":
+        return "".join(ch for ch in subject if ch.isdigit() or ch == "+")
+    return subject.strip().lower()
+
+
+def build_dictionary() -> bytes:
+    """
+    Shared compression dictionary made from the report templates themselves.
+    Text templates go last because zlib favours the end of the dictionary.
+    """
+    import utils
+
+    phone_info = {
+        "formatted_number": "+91 98765 43210", "is_valid": True, "number_type": 1,
+        "country": "India", "state": "Tamil Nadu", "district": "Chennai", "city": "Chennai",
+        "timezone": "Asia/Calcutta", "carrier": "Airtel", "latitude": 13.0827, "longitude": 80.2707,
+    }
+    ip_info = {
+        "ip": "49.205.0.1", "country": "India", "region": "Tamil Nadu", "city": "Chennai",
+        "postal": "600001", "timezone": "Asia/Kolkata", "org": "Example Broadband", "asn": "AS24309",
+        "isp": "Example Broadband", "latitude": 13.0827, "longitude": 80.2707,
+    }
+    timestamp = "2024-01-01 00:00:00"
+
+    parts = []
+    for path in (utils.generate_pdf_report(phone_info, timestamp), utils.generate_ip_pdf_report(ip_info, timestamp)):
+        with open(path, "rb") as f:
+            parts.append(f.read())
+        os.remove(path)
+    parts.append(utils.generate_ip_report(ip_info, timestamp).encode("utf-8"))
+    parts.append(utils.generate_report(phone_info, timestamp).encode("utf-8"))
+    return b"".join(parts)[-MAX_DICTIONARY_BYTES:]
+
+
+class _Codec:
+    """Compressor and decompressor primed with one dictionary"""
+
+    def __init__(self, name: str, dictionary: bytes):
+        self.name = name
+        if name == "zstd":
+            import zstandard
+            dict_data = zstandard.ZstdCompressionDict(dictionary, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+            self._zstd_compressor = zstandard.ZstdCompressor(level=10, dict_data=dict_data)
+            self._zstd_decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+            self._lock = threading.Lock()
+        else:
+            # Copying a primed object skips re-hashing the dictionary for every report
+            self._compress_template = zlib.compressobj(9, zdict=dictionary)
+            self._decompress_template = zlib.decompressobj(zdict=dictionary)
+
+    def compress(self, payload: bytes) -> bytes:
+        if self.name == "zstd":
+            with self._lock:
+                return self._zstd_compressor.compress(payload)
+        compressor = self._compress_template.copy()
+        return compressor.compress(payload) + compressor.flush()
+
+    def decompress_chunks(self, read: Callable[[int], bytes], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """Decompress from a read(size) callable, yielding output as it becomes available"""
+        if self.name == "zstd":
+            decompressor = self._zstd_decompressor.decompressobj()
+        else:
+            decompressor = self._decompress_template.copy()
+        while True:
+            data = read(chunk_size)
+            if not data:
+                break
+            output = decompressor.decompress(data)
+            if output:
+                yield output
+        if self.name == "zlib":
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+
+
+class ReportArchive:
+    """
+    Append-only store of generated reports, compressed with a shared dictionary and
+    indexed by subject (number or IP), country, carrier and time
+    """
+
+    def __init__(self, path: str = ARCHIVE_PATH, codec: str = ARCHIVE_CODEC,
+                 dictionary: Optional[bytes] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS dictionaries (
+                id INTEGER PRIMARY KEY,
+                codec TEXT NOT NULL,
+                data BLOB NOT NULL,
+                created_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                kind TEXT NOT NULL,
+                format TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                country TEXT,
+                carrier TEXT,
+                dictionary_id INTEGER NOT NULL REFERENCES dictionaries (id),
+                raw_size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS reports_by_subject ON reports (subject, created_at);
+            CREATE INDEX IF NOT EXISTS reports_by_country ON reports (country, created_at);
+            CREATE INDEX IF NOT EXISTS reports_by_carrier ON reports (carrier, created_at);
+            CREATE INDEX IF NOT EXISTS reports_by_time ON reports (created_at);
+            -- Payloads live apart from the metadata so index scans never page through blobs
+            CREATE TABLE IF NOT EXISTS payloads (
+                report_id INTEGER PRIMARY KEY,
+                data BLOB NOT NULL
+            );
+            """
+        )
+        self._connection.commit()
+
+        self._codecs: Dict[int, _Codec] = {}
+        self.dictionary_id = self._current_dictionary(_available_codec(codec), dictionary)
+
+    def _current_dictionary(self, codec: str, dictionary: Optional[bytes]) -> int:
+        """Reuse the newest stored dictionary for this codec, or store a new one"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, data FROM dictionaries WHERE codec = ? ORDER BY id DESC LIMIT 1", (codec,)
+            ).fetchone()
+            if row is not None and (dictionary is None or bytes(row[1]) == dictionary):
+                return row[0]
+        data = dictionary if dictionary is not None else build_dictionary()
+        with self._lock:
+            dictionary_id = self._connection.execute(
+                "INSERT INTO dictionaries (codec, data, created_at) VALUES (?, ?, ?)", (codec, data, time.time())
+            ).lastrowid
+            self._connection.commit()
+        return dictionary_id
+
+    def _codec(self, dictionary_id: int) -> _Codec:
+        codec = self._codecs.get(dictionary_id)
+        if codec is None:
+            with self._lock:
+                name, data = self._connection.execute(
+                    "SELECT codec, data FROM dictionaries WHERE id = ?", (dictionary_id,)
+                ).fetchone()
+            codec = self._codecs[dictionary_id] = _Codec(name, bytes(data))
+        return codec
+
+    @property
+    def codec(self) -> str:
+        return self._codec(self.dictionary_id).name
+
+    def add(self, kind: str, report_format: str, subject: str, payload: bytes,
+            country: Optional[str] = None, carrier: Optional[str] = None,
+            created_at: Optional[float] = None) -> int:
+        """
+        Archive one report, returning its id
+        """
+        return self.add_many([{
+            "kind": kind, "format": report_format, "subject": subject, "payload": payload,
+            "country": country, "carrier": carrier, "created_at": created_at,
+        }])[0]
+
+    def add_many(self, reports: Iterable[Dict]) -> List[int]:
+        """
+        Archive reports in batched transactions; each dict has kind, format, subject, payload
+        and optionally country, carrier and created_at
+        """
+        codec = self._codec(self.dictionary_id)
+        ids = []
+        batch = []
+
+        def flush():
+            with self._lock:
+                with self._connection:
+                    for metadata, compressed in batch:
+                        report_id = self._connection.execute(
+                            "INSERT INTO reports (created_at, kind, format, subject, country, carrier, "
+                            "dictionary_id, raw_size, stored_size) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                            metadata
+                        ).lastrowid
+                        self._connection.execute(
+                            "INSERT INTO payloads (report_id, data) VALUES (?, ?)", (report_id, compressed)
+                        )
+                        ids.append(report_id)
+            batch.clear()
+
+        for report in reports:
+            kind, report_format = report["kind"], report["format"]
+            if kind not in REPORT_KINDS or report_format not in REPORT_FORMATS:
+                raise ValueError(f"Unknown report kind or format: {kind}/{report_format}")
+            payload = report["payload"]
+            compressed = codec.compress(payload)
+            batch.append(((
+                report.get("created_at") or time.time(), kind, report_format,
+                normalize_subject(kind, report["subject"]),
+                report.get("country"), report.get("carrier"),
+                self.dictionary_id, len(payload), len(compressed),
+            ), compressed))
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+        return ids
+
+    def search(self, kind: Optional[str] = None, subject: Optional[str] = None,
+               country: Optional[str] = None, carrier: Optional[str] = None,
+               since: Optional[float] = None, until: Optional[float] = None,
+               report_format: Optional[str] = None, limit: int = 100,
+               before: Optional[Tuple[float, int]] = None) -> List[Dict]:
+        """
+        Newest matching reports first; pass the last row's (created_at, id) as before to fetch the next page
+        """
+        clauses, parameters = [], []
+        if subject:
+            clauses.append("subject = ?")
+            parameters.append(normalize_subject(kind or ("ip" if "." in subject or ":" in subject else "phone"),
+                                                subject))
+        for column, value in (("kind", kind), ("country", country), ("carrier", carrier),
+                              ("format", report_format)):
+            if value:
+                clauses.append(f"{column} = ?")
+                parameters.append(value)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            parameters.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            parameters.append(until)
+        if before is not None:
+            # Page on the sort key itself, since ids are not in created_at order
+            clauses.append("(created_at, id) < (?, ?)")
+            parameters.extend(before)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(_METADATA_COLUMNS)} FROM reports {where} "
+                f"ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*parameters, limit)
+            ).fetchall()
+        return [dict(zip(_METADATA_COLUMNS, row)) for row in rows]
+
+    def iter_search(self, page_size: int = 1000, **filters) -> Iterator[Dict]:
+        """Every matching report, fetched a page at a time"""
+        before = None
+        while True:
+            page = self.search(limit=page_size, before=before, **filters)
+            yield from page
+            if len(page) < page_size:
+                return
+            before = (page[-1]["created_at"], page[-1]["id"])
+
+    def stream_report(self, report_id: int, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+        """
+        Decompress a report incrementally straight from its SQLite blob
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT dictionary_id FROM reports WHERE id = ?", (report_id,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(f"No archived report {report_id}")
+        codec = self._codec(row[0])
+
+        with self._lock:
+            blob = self._connection.blobopen("payloads", "data", report_id, readonly=True)
+
+        def read(size: int) -> bytes:
+            with self._lock:
+                return blob.read(size)
+
+        try:
+            yield from codec.decompress_chunks(read, chunk_size)
+        finally:
+            with self._lock:
+                blob.close()
+
+    def get_report(self, report_id: int) -> bytes:
+        return b"".join(self.stream_report(report_id))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            count, raw, stored = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM reports"
+            ).fetchone()
+        return {
+            "reports": count,
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "ratio": raw / stored if stored else 0.0,
+            "file_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
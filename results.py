@@ -0,0 +1,233 @@
+from array import array
+from dataclasses import dataclass, fields
+from typing import Dict, Iterable, List, Optional, Union
+
+NUMBER_TYPES = {
+    0: "FIXED_LINE",
+    1: "MOBILE",
+    2: "FIXED_LINE_OR_MOBILE",
+    3: "TOLL_FREE",
+    4: "PREMIUM_RATE",
+    5: "SHARED_COST",
+    6: "VOIP",
+    7: "PERSONAL_NUMBER",
+    8: "PAGER",
+    9: "UAN",
+    10: "UNKNOWN",
+    27: "EMERGENCY",
+    28: "VOICEMAIL",
+}
+
+# Placeholder the lookup functions put in every field when a lookup fails
+ERROR_VALUE = "Error"
+
+
+def _clean(value):
+    """Drop the legacy "Error" placeholder so failures only show in the status column"""
+    return None if value == ERROR_VALUE else value
+
+
+@dataclass(slots=True)
+class PhoneResult:
+    """One phone lookup, as returned by get_phone_info"""
+    formatted_number: Optional[str]
+    status: str
+    is_valid: bool
+    number_type: Optional[str]
+    country: Optional[str]
+    state: Optional[str]
+    district: Optional[str]
+    city: Optional[str]
+    carrier: Optional[str]
+    timezone: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+    @classmethod
+    def from_info(cls, phone_info: Dict[str, str]) -> "PhoneResult":
+        status = "error" if phone_info["country"] == ERROR_VALUE else "ok"
+        number_type = phone_info["number_type"]
+        return cls(
+            formatted_number=_clean(phone_info["formatted_number"]),
+            status=status,
+            is_valid=bool(phone_info["is_valid"]),
+            number_type=NUMBER_TYPES.get(number_type, "UNKNOWN") if status == "ok" else None,
+            country=_clean(phone_info["country"]),
+            state=_clean(phone_info["state"]),
+            district=_clean(phone_info["district"]),
+            city=_clean(phone_info["city"]),
+            carrier=_clean(phone_info["carrier"]),
+            timezone=_clean(phone_info["timezone"]),
+            latitude=phone_info["latitude"],
+            longitude=phone_info["longitude"],
+        )
+
+
+@dataclass(slots=True)
+class IPResult:
+    """One IP lookup, as returned by get_ip_info"""
+    ip: str
+    status: str
+    error: Optional[str]
+    country: Optional[str]
+    region: Optional[str]
+    city: Optional[str]
+    postal: Optional[str]
+    timezone: Optional[str]
+    org: Optional[str]
+    asn: Optional[str]
+    isp: Optional[str]
+    network: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+
+    @classmethod
+    def from_info(cls, ip_info: Dict[str, str]) -> "IPResult":
+        return cls(
+            ip=ip_info["ip"],
+            status="error" if ip_info["country"] == ERROR_VALUE else "ok",
+            error=ip_info.get("error"),
+            country=_clean(ip_info["country"]),
+            region=_clean(ip_info["region"]),
+            city=_clean(ip_info["city"]),
+            postal=_clean(ip_info["postal"]),
+            timezone=_clean(ip_info["timezone"]),
+            org=_clean(ip_info["org"]),
+            asn=_clean(ip_info["asn"]),
+            isp=_clean(ip_info["isp"]),
+            network=ip_info.get("network"),
+            latitude=ip_info["latitude"],
+            longitude=ip_info["longitude"],
+        )
+
+
+Result = Union[PhoneResult, IPResult]
+
+# Low-cardinality columns stored as dictionary codes and exported as Arrow dictionaries
+CATEGORICAL_FIELDS = {
+    "status", "number_type", "country", "state", "district", "city",
+    "carrier", "timezone", "region", "org", "asn", "isp", "error",
+}
+FLOAT_FIELDS = {"latitude", "longitude"}
+BOOL_FIELDS = {"is_valid"}
+
+
+class _CategoryColumn:
+    """Append-only dictionary-encoded column"""
+
+    __slots__ = ("codes", "values", "_index")
+
+    def __init__(self):
+        self.codes = array("i")
+        self.values = []
+        self._index = {}
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self.codes.append(-1)
+            return
+        code = self._index.get(value)
+        if code is None:
+            code = self._index[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+
+class ResultsTable:
+    """
+    Columnar store for batches of lookup results.
+    Categorical columns are dictionary codes, coordinates are packed doubles.
+    """
+
+    def __init__(self, record_type: type = PhoneResult):
+        self.record_type = record_type
+        self.field_names = [field.name for field in fields(record_type)]
+        self.columns = {}
+        for name in self.field_names:
+            if name in CATEGORICAL_FIELDS:
+                self.columns[name] = _CategoryColumn()
+            elif name in FLOAT_FIELDS:
+                self.columns[name] = array("d")
+            elif name in BOOL_FIELDS:
+                self.columns[name] = bytearray()
+            else:
+                self.columns[name] = []
+        self._rows = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def append(self, record: Result):
+        for name in self.field_names:
+            value = getattr(record, name)
+            column = self.columns[name]
+            if name in FLOAT_FIELDS:
+                column.append(float("nan") if value is None else value)
+            elif name in BOOL_FIELDS:
+                column.append(1 if value else 0)
+            else:
+                column.append(value)
+        self._rows += 1
+
+    def extend(self, records: Iterable[Result]):
+        for record in records:
+            self.append(record)
+
+    def row(self, index: int) -> Result:
+        """Rebuild a single record from the columns"""
+        values = {}
+        for name in self.field_names:
+            column = self.columns[name]
+            if name in CATEGORICAL_FIELDS:
+                code = column.codes[index]
+                values[name] = column.values[code] if code >= 0 else None
+            elif name in FLOAT_FIELDS:
+                value = column[index]
+                values[name] = None if value != value else value
+            elif name in BOOL_FIELDS:
+                values[name] = bool(column[index])
+            else:
+                values[name] = column[index]
+        return self.record_type(**values)
+
+    def to_arrow(self):
+        """
+        Convert to a pyarrow Table with dictionary-encoded categorical columns
+        """
+        try:
+            import numpy as np
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("pyarrow is required for Arrow, Parquet and Feather export") from e
+
+        arrays = []
+        for name in self.field_names:
+            column = self.columns[name]
+            if name in CATEGORICAL_FIELDS:
+                codes = np.frombuffer(column.codes, dtype=np.int32)
+                indices = pa.array(codes, mask=codes < 0, type=pa.int32())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(column.values, type=pa.string())))
+            elif name in FLOAT_FIELDS:
+                arrays.append(pa.array(np.frombuffer(column, dtype=np.float64), from_pandas=True))
+            elif name in BOOL_FIELDS:
+                arrays.append(pa.array(np.frombuffer(column, dtype=np.uint8).astype(bool)))
+            else:
+                arrays.append(pa.array(column, type=pa.string()))
+        return pa.Table.from_arrays(arrays, names=self.field_names)
+
+    def write_parquet(self, path: str, compression: str = "zstd"):
+        """
+        Write the table to a Parquet file, keeping dictionary encoding
+        """
+        import pyarrow.parquet as pq
+        pq.write_table(self.to_arrow(), path, compression=compression)
+
+    def write_feather(self, path: str, compression: str = "zstd"):
+        """
+        Write the table to a Feather (Arrow IPC) file
+        """
+        import pyarrow.feather as feather
+        feather.write_feather(self.to_arrow(), path, compression=compression)
+
+    def to_records(self) -> List[Result]:
+        return [self.row(index) for index in range(self._rows)]
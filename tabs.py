@@ -0,0 +1,879 @@
+import streamlit as st
+from utils import (
+    validate_phone_number, get_phone_info, get_location_map, 
+    generate_report, generate_pdf_report,
+    get_ip_info, get_ip_location_map, generate_ip_report, generate_ip_pdf_report,
+    get_ip_cluster_map, get_ip_range_map, get_correlation_map
+)
+from log_ingest import LOG_DIR, follow_file, enrich_stream, resolve_log_path, IngestStats
+from ip_ranges import analyse_ip_ranges
+from number_blocks import analyse_number_block
+from phone_normalizer import normalize_number, normalize_numbers, region_for_country
+from watchlist import Watchlist, WatchlistScheduler, WATCH_KINDS
+from exporters import EXPORT_FORMATS, RECORD_TYPES, export, lookup_records
+from results import ResultsTable
+from admission import AdmissionController, AdmissionRejected, streamlit_identity
+from report_archive import ARCHIVE_ENABLED, REPORT_FORMATS, ReportArchive
+import streamlit.components.v1 as components
+from datetime import datetime
+import base64
+import os
+import time
+
+# Country codes data
+country_codes = [
+    {"country": "Afghanistan", "code": "93"},
+    {"country": "Albania", "code": "355"},
+    {"country": "Algeria", "code": "213"},
+    {"country": "Andorra", "code": "376"},
+    {"country": "Angola", "code": "244"},
+    {"country": "Argentina", "code": "54"},
+    {"country": "Armenia", "code": "374"},
+    {"country": "Australia", "code": "61"},
+    {"country": "Austria", "code": "43"},
+    {"country": "Azerbaijan", "code": "994"},
+    {"country": "Bahrain", "code": "973"},
+    {"country": "Bangladesh", "code": "880"},
+    {"country": "Belarus", "code": "375"},
+    {"country": "Belgium", "code": "32"},
+    {"country": "Bhutan", "code": "975"},
+    {"country": "Bolivia", "code": "591"},
+    {"country": "Brazil", "code": "55"},
+    {"country": "Bulgaria", "code": "359"},
+    {"country": "Canada", "code": "1"},
+    {"country": "Chile", "code": "56"},
+    {"country": "China", "code": "86"},
+    {"country": "Colombia", "code": "57"},
+    {"country": "Costa Rica", "code": "506"},
+    {"country": "Croatia", "code": "385"},
+    {"country": "Cuba", "code": "53"},
+    {"country": "Cyprus", "code": "357"},
+    {"country": "Czech Republic", "code": "420"},
+    {"country": "Denmark", "code": "45"},
+    {"country": "Egypt", "code": "20"},
+    {"country": "Estonia", "code": "372"},
+    {"country": "Finland", "code": "358"},
+    {"country": "France", "code": "33"},
+    {"country": "Germany", "code": "49"},
+    {"country": "Greece", "code": "30"},
+    {"country": "Hong Kong", "code": "852"},
+    {"country": "Hungary", "code": "36"},
+    {"country": "India", "code": "91"},
+    {"country": "Indonesia", "code": "62"},
+    {"country": "Iran", "code": "98"},
+    {"country": "Iraq", "code": "964"},
+    {"country": "Ireland", "code": "353"},
+    {"country": "Israel", "code": "972"},
+    {"country": "Italy", "code": "39"},
+    {"country": "Japan", "code": "81"},
+    {"country": "Jordan", "code": "962"},
+    {"country": "Kazakhstan", "code": "7"},
+    {"country": "Kenya", "code": "254"},
+    {"country": "Kuwait", "code": "965"},
+    {"country": "Latvia", "code": "371"},
+    {"country": "Lebanon", "code": "961"},
+    {"country": "Libya", "code": "218"},
+    {"country": "Malaysia", "code": "60"},
+    {"country": "Maldives", "code": "960"},
+    {"country": "Mexico", "code": "52"},
+    {"country": "Netherlands", "code": "31"},
+    {"country": "New Zealand", "code": "64"},
+    {"country": "Nigeria", "code": "234"},
+    {"country": "North Korea", "code": "850"},
+    {"country": "Norway", "code": "47"},
+    {"country": "Oman", "code": "968"},
+    {"country": "Pakistan", "code": "92"},
+    {"country": "Palestine", "code": "970"},
+    {"country": "Peru", "code": "51"},
+    {"country": "Philippines", "code": "63"},
+    {"country": "Poland", "code": "48"},
+    {"country": "Portugal", "code": "351"},
+    {"country": "Qatar", "code": "974"},
+    {"country": "Romania", "code": "40"},
+    {"country": "Russia", "code": "7"},
+    {"country": "Saudi Arabia", "code": "966"},
+    {"country": "Serbia", "code": "381"},
+    {"country": "Singapore", "code": "65"},
+    {"country": "South Africa", "code": "27"},
+    {"country": "South Korea", "code": "82"},
+    {"country": "Spain", "code": "34"},
+    {"country": "Sri Lanka", "code": "94"},
+    {"country": "Sweden", "code": "46"},
+    {"country": "Switzerland", "code": "41"},
+    {"country": "Syria", "code": "963"},
+    {"country": "Taiwan", "code": "886"},
+    {"country": "Thailand", "code": "66"},
+    {"country": "Turkey", "code": "90"},
+    {"country": "UAE", "code": "971"},
+    {"country": "UK", "code": "44"},
+    {"country": "USA", "code": "1"},
+    {"country": "Ukraine", "code": "380"},
+    {"country": "Vietnam", "code": "84"},
+    {"country": "Yemen", "code": "967"},
+    {"country": "Zimbabwe", "code": "263"}
+]
+
+# Rate limits and the fair queue are shared by every session in this server process
+@st.cache_resource
+def get_admission_controller():
+    return AdmissionController()
+
+# Report archive for audit retention, opened on first use
+@st.cache_resource
+def get_report_archive():
+    return ReportArchive()
+
+def archive_report(kind, subject, report, pdf_bytes, country, carrier=None):
+    """
+    Keep the text and PDF versions of a report in the archive
+    """
+    if not ARCHIVE_ENABLED:
+        return
+    try:
+        get_report_archive().add_many([
+            {"kind": kind, "format": "text", "subject": subject, "payload": report.encode("utf-8"),
+             "country": country, "carrier": carrier},
+            {"kind": kind, "format": "pdf", "subject": subject, "payload": pdf_bytes,
+             "country": country, "carrier": carrier},
+        ])
+    except Exception as e:
+        st.error(f"Error archiving report: {str(e)}")
+
+def show_rejection(e):
+    st.warning(f"Too many lookups: {e.reason.lower()} limit reached. Please try again in {e.retry_after:.0f} seconds.")
+
+def keep_inputs(*keys):
+    """
+    Hold on to a hidden tab's inputs; its widgets do not run, and Streamlit would drop their values
+    """
+    for key in keys:
+        if key in st.session_state:
+            st.session_state[key] = st.session_state[key]
+
+def admitted_lookup(lookup, value):
+    """
+    Run a lookup through admission control, showing the queue position while it waits
+    """
+    session_id, client_id = streamlit_identity()
+    queue_status = st.empty()
+    try:
+        with get_admission_controller().slot(
+            session_id, client_id,
+            on_wait=lambda position: queue_status.info(f"⏳ Queued, position {position}")
+        ):
+            queue_status.empty()
+            return lookup(value)
+    except AdmissionRejected as e:
+        queue_status.empty()
+        show_rejection(e)
+        return None
+
+def admitted_batch(lookup, rejections=None):
+    """
+    Wrap a lookup for batch runs against the batch budget; see AdmissionController.batch_lookup
+    """
+    # Worker threads have no script context, so resolve the caller here
+    session_id, client_id = streamlit_identity()
+    return get_admission_controller().batch_lookup(lookup, session_id, client_id, rejections)
+
+# One watchlist and re-enrichment scheduler shared by every session; its lookups count
+# against the admission controller under their own identity and wait in the fair queue
+WATCHLIST_IDENTITY = "watchlist-scheduler"
+
+@st.cache_resource
+def get_watchlist_scheduler():
+    controller = get_admission_controller()
+
+    def admit():
+        try:
+            controller.admit(WATCHLIST_IDENTITY, WATCHLIST_IDENTITY)
+            return True
+        except AdmissionRejected:
+            return False
+
+    return WatchlistScheduler(Watchlist(), admit=admit, slot=lambda: controller.queued(WATCHLIST_IDENTITY))
+
+def phone_lookup_tab():
+    col1, col2 = st.columns([2, 1])
+
+    with col1:
+        # Input section
+        st.subheader("Enter Mobile Number Details")
+
+        # Country selection with search
+        selected_country = st.selectbox(
+            "Select Country",
+            options=[row["country"] for row in country_codes],
+            index=next(i for i, row in enumerate(country_codes) if row["country"] == "India"),
+            help="Search and select your country",
+            key="phone_country"
+        )
+
+        # Get country code
+        country_code = next(row["code"] for row in country_codes if row["country"] == selected_country)
+        default_region = region_for_country(selected_country, country_code)
+
+        auto_detect = st.checkbox(
+            "Auto-detect country from number",
+            value=True,
+            help="Numbers starting with +, 00 or a known calling code override the selected country",
+            key="phone_auto_detect"
+        )
+
+        # Phone number input
+        phone_number = st.text_input(
+            "Enter Mobile Number",
+            placeholder=f"Enter number without country code (e.g., 9876543210)",
+            key="phone_number"
+        )
+
+        if st.button("Track Number", type="primary"):
+            if phone_number:
+                # Validate number
+                if auto_detect:
+                    normalized = normalize_number(phone_number, default_region)
+                    is_valid, formatted_number = normalized["is_valid"], normalized["e164"]
+                    if normalized["ambiguous"]:
+                        st.warning(f"Country is ambiguous between: {normalized['candidates']}")
+                else:
+                    is_valid, formatted_number = validate_phone_number(phone_number, country_code)
+
+                # Get phone information once admitted
+                phone_info = admitted_lookup(get_phone_info, formatted_number) if is_valid else None
+
+                if phone_info is not None:
+                    # Add to search history
+                    if formatted_number not in st.session_state.search_history:
+                        st.session_state.search_history.insert(0, formatted_number)
+                        if len(st.session_state.search_history) > 5:
+                            st.session_state.search_history.pop()
+
+                    # Generate timestamp
+                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+                    # Generate and store report
+                    report = generate_report(phone_info, timestamp)
+                    st.session_state.reports[formatted_number] = report
+
+                    # Display results
+                    st.markdown("### Results")
+
+                    # Display metrics in three rows
+                    col_info1, col_info2, col_info3 = st.columns(3)
+                    with col_info1:
+                        st.metric("Country", phone_info["country"])
+                    with col_info2:
+                        st.metric("State", phone_info["state"])
+                    with col_info3:
+                        st.metric("District", phone_info["district"])
+
+                    col_info4, col_info5, col_info6 = st.columns(3)
+                    with col_info4:
+                        st.metric("City", phone_info["city"])
+                    with col_info5:
+                        st.metric("Carrier", phone_info["carrier"])
+                    with col_info6:
+                        st.metric("Timezone", phone_info["timezone"])
+
+                    col_info7, col_info8, col_info9 = st.columns(3)
+                    with col_info7:
+                        st.metric("Valid Number", "Yes" if phone_info["is_valid"] else "No")
+                    with col_info8:
+                        st.metric("Formatted Number", phone_info["formatted_number"])
+                    with col_info9:
+                        if phone_info["latitude"] and phone_info["longitude"]:
+                            st.metric("Coordinates", f"{phone_info['latitude']:.4f}, {phone_info['longitude']:.4f}")
+
+                    # Display detailed report
+                    with st.expander("📄 View Detailed Report", expanded=True):
+                        st.text(report)
+
+                        # Generate and provide PDF download
+                        pdf_path = generate_pdf_report(phone_info, timestamp)
+                        with open(pdf_path, "rb") as pdf_file:
+                            pdf_bytes = pdf_file.read()
+                        os.remove(pdf_path)
+                        archive_report("phone", formatted_number, report, pdf_bytes,
+                                       phone_info["country"], phone_info["carrier"])
+                        st.download_button(
+                            label="📥 Download PDF Report",
+                            data=pdf_bytes,
+                            file_name=f"phone_report_{formatted_number}_{timestamp.replace(' ', '_')}.pdf",
+                            mime="application/pdf"
+                        )
+
+                    # Generate and display map
+                    if phone_info["country"] != "Unknown":
+                        st.markdown("### 🗺️ Location Map")
+                        map_data = get_location_map(phone_info)
+                        if map_data:
+                            # Generate and save map HTML
+                            map_path = f"phone_{formatted_number}_map.html"
+                            map_data.save(map_path)
+                            
+                            # Display map
+                            map_html = map_data._repr_html_()
+                            components.html(map_html, height=400)
+                            
+                            # Add download button for HTML map
+                            with open(map_path, "rb") as map_file:
+                                map_bytes = map_file.read()
+                                st.download_button(
+                                    label="📥 Download Location Map",
+                                    data=map_bytes,
+                                    file_name=map_path,
+                                    mime="text/html"
+                                )
+
+                            # Add map legend
+                            st.markdown("""
+                            **Map Legend:**
+                            - 📍 Red Marker: Approximate Location
+                            - 🔴 Red Circle: Potential Area (50km radius)
+                            """)
+                elif not is_valid:
+                    st.error("Invalid phone number format. Please check and try again.")
+            else:
+                st.warning("Please enter a phone number.")
+
+        with st.expander("📋 Normalize a Batch of Numbers"):
+            batch_numbers = st.text_area(
+                "Paste numbers (one per line, any format)",
+                placeholder="+44 20 7946 0958\n0044 20 7946 0958\n919876543210",
+                key="phone_batch"
+            )
+            if st.button("Normalize Numbers"):
+                import pandas as pd
+                normalized_rows = normalize_numbers(batch_numbers.splitlines(), default_region)
+                if normalized_rows:
+                    normalized_table = pd.DataFrame(normalized_rows)
+                    ambiguous_count = int(normalized_table["ambiguous"].sum())
+                    if ambiguous_count:
+                        st.warning(f"{ambiguous_count} number(s) have an ambiguous country.")
+                    st.dataframe(normalized_table, hide_index=True)
+                else:
+                    st.warning("Please paste at least one number.")
+
+    with col2:
+        st.markdown("""
+        ### How to use
+        1. Select the country from the dropdown
+        2. Enter the mobile number, with or without country code
+        3. Click "Track Number" to get details
+
+        ### Features
+        - Country and region detection
+        - State and district information
+        - Carrier information
+        - Timezone details
+        - Interactive map visualization
+        - Detailed PDF reports
+        - Search history tracking
+        """)
+
+def ip_lookup_tab():
+    st.subheader("Enter IP Address Details")
+
+    # IP address input
+    ip_address = st.text_input(
+        "Enter IP Address",
+        placeholder="Enter IP address (e.g., 8.8.8.8)",
+        key="ip_address"
+    )
+
+    if st.button("Track IP", type="primary"):
+        # Get IP information once admitted
+        ip_info = admitted_lookup(get_ip_info, ip_address) if ip_address else None
+
+        if ip_info is not None:
+
+            # Generate timestamp
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            # Add to search history
+            if ip_address not in st.session_state.ip_search_history:
+                st.session_state.ip_search_history.insert(0, ip_address)
+                if len(st.session_state.ip_search_history) > 5:
+                    st.session_state.ip_search_history.pop()
+
+            # Generate and store report
+            report = generate_ip_report(ip_info, timestamp)
+            st.session_state.ip_reports[ip_address] = report
+
+            # Display results
+            st.markdown("### Results")
+
+            # Display metrics in three rows
+            col_info1, col_info2, col_info3 = st.columns(3)
+            with col_info1:
+                st.metric("IP Address", ip_info["ip"])
+            with col_info2:
+                st.metric("Country", ip_info["country"])
+            with col_info3:
+                st.metric("Region", ip_info["region"])
+
+            col_info4, col_info5, col_info6 = st.columns(3)
+            with col_info4:
+                st.metric("City", ip_info["city"])
+            with col_info5:
+                st.metric("ISP", ip_info["isp"])
+            with col_info6:
+                st.metric("Timezone", ip_info["timezone"])
+
+            col_info7, col_info8, col_info9 = st.columns(3)
+            with col_info7:
+                st.metric("Organization", ip_info["org"])
+            with col_info8:
+                st.metric("ASN", ip_info["asn"])
+            with col_info9:
+                if ip_info["latitude"] and ip_info["longitude"]:
+                    st.metric("Coordinates", f"{ip_info['latitude']:.4f}, {ip_info['longitude']:.4f}")
+
+            # Display detailed report
+            with st.expander("📄 View Detailed Report", expanded=True):
+                st.text(report)
+
+                # Generate and provide PDF download
+                pdf_path = generate_ip_pdf_report(ip_info, timestamp)
+                with open(pdf_path, "rb") as pdf_file:
+                    pdf_bytes = pdf_file.read()
+                os.remove(pdf_path)
+                archive_report("ip", ip_address, report, pdf_bytes, ip_info["country"], ip_info["isp"])
+                st.download_button(
+                    label="📥 Download PDF Report",
+                    data=pdf_bytes,
+                    file_name=f"ip_report_{ip_address}_{timestamp.replace(' ', '_')}.pdf",
+                    mime="application/pdf"
+                )
+
+            # Generate and display map
+            if ip_info["country"] != "Unknown":
+                st.markdown("### 🗺️ Location Map")
+                map_data = get_ip_location_map(ip_info)
+                if map_data:
+                    map_html = map_data._repr_html_()
+                    components.html(map_html, height=400)
+
+                    # Add map legend
+                    st.markdown("""
+                    **Map Legend:**
+                    - 📍 Red Marker: Approximate Location
+                    - 🔴 Red Circle: Potential Area (50km radius)
+                    """)
+        elif not ip_address:
+            st.warning("Please enter an IP address.")
+
+def log_stream_tab():
+    st.subheader("Stream IPs from an Access Log")
+
+    log_path = st.text_input(
+        f"Log File Path (inside {LOG_DIR})",
+        placeholder=os.path.join(LOG_DIR, "access.log"),
+        key="log_path"
+    )
+
+    col_opt1, col_opt2, col_opt3 = st.columns(3)
+    with col_opt1:
+        follow_log = st.checkbox("Follow file (tail -F)", value=True, key="log_follow")
+    with col_opt2:
+        stream_seconds = st.number_input("Run for (seconds)", min_value=5, max_value=3600, value=60,
+                                         key="log_seconds")
+    with col_opt3:
+        stream_workers = st.number_input("Lookup workers", min_value=1, max_value=16, value=4,
+                                         key="log_workers")
+
+    if st.button("Start Ingestion", type="primary"):
+        import pandas as pd
+        if log_path:
+            stats = IngestStats()
+            metrics_placeholder = st.empty()
+            tables_placeholder = st.empty()
+            map_placeholder = st.empty()
+
+            def render_stats(with_map: bool):
+                with metrics_placeholder.container():
+                    col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+                    col_m1.metric("Lines", stats.lines)
+                    col_m2.metric("IPs Seen", stats.ips_seen)
+                    col_m3.metric("Unique Lookups", stats.lookups)
+                    col_m4.metric("Errors", stats.errors)
+
+                with tables_placeholder.container():
+                    col_t1, col_t2 = st.columns(2)
+                    with col_t1:
+                        st.markdown("**Top Countries**")
+                        st.dataframe(pd.DataFrame(stats.countries.most_common(10), columns=["Country", "IPs"]),
+                                     hide_index=True)
+                    with col_t2:
+                        st.markdown("**Top ASNs**")
+                        st.dataframe(pd.DataFrame(stats.asns.most_common(10), columns=["ASN", "IPs"]),
+                                     hide_index=True)
+
+                if with_map:
+                    cluster_map = get_ip_cluster_map(list(stats.points))
+                    if cluster_map:
+                        with map_placeholder.container():
+                            components.html(cluster_map._repr_html_(), height=450)
+
+            try:
+                lines = follow_file(resolve_log_path(log_path), follow=follow_log)
+                started = time.monotonic()
+                last_render = last_map = 0.0
+                for _ in enrich_stream(lines, stats, max_workers=int(stream_workers),
+                                       lookup=admitted_batch(get_ip_info)):
+                    now = time.monotonic()
+                    if now - last_render >= 1:
+                        render_map = now - last_map >= 5
+                        render_stats(render_map)
+                        last_render = now
+                        if render_map:
+                            last_map = now
+                    if now - started >= stream_seconds:
+                        break
+                render_stats(True)
+            except ValueError as e:
+                st.error(str(e))
+            except FileNotFoundError:
+                st.error(f"Log file not found: {log_path}")
+            except AdmissionRejected as e:
+                render_stats(True)
+                show_rejection(e)
+        else:
+            st.warning("Please enter a log file path.")
+
+def ip_range_tab():
+    st.subheader("Summarise IP Ranges")
+
+    ip_ranges_text = st.text_area(
+        "Enter CIDRs or ranges (one per line)",
+        placeholder="203.0.113.0/22\n198.51.100.10 - 198.51.100.200\n2001:db8::/48",
+        key="range_queries"
+    )
+    max_range_queries = st.number_input("Maximum upstream lookups", min_value=1, max_value=5000, value=256,
+                                        key="range_max_queries")
+
+    if st.button("Analyse Ranges", type="primary"):
+        import pandas as pd
+        range_queries = [line.strip() for line in ip_ranges_text.splitlines() if line.strip()]
+        if range_queries:
+            range_rejections = []
+            try:
+                range_rows = analyse_ip_ranges(range_queries, max_queries=int(max_range_queries),
+                                               lookup=admitted_batch(get_ip_info, range_rejections))
+            except ValueError as e:
+                st.error(f"Invalid range: {str(e)}")
+            else:
+                if range_rejections:
+                    show_rejection(range_rejections[0])
+                st.markdown("### Sub-ranges")
+                range_table = pd.DataFrame(range_rows)[[
+                    "query", "sub_range", "addresses", "country", "region", "city", "asn", "org", "status"
+                ]]
+                st.dataframe(range_table, hide_index=True)
+
+                skipped = sum(row["addresses"] for row in range_rows if row["status"] == "skipped")
+                if skipped and not range_rejections:
+                    st.warning(f"{skipped:,} addresses were not queried. Raise the lookup limit to cover them.")
+
+                range_map = get_ip_range_map(range_rows)
+                if range_map:
+                    st.markdown("### 🗺️ Range Map")
+                    components.html(range_map._repr_html_(), height=450)
+        else:
+            st.warning("Please enter at least one range.")
+
+def number_block_tab():
+    st.subheader("Analyse a Number Block")
+
+    block_pattern = st.text_input(
+        "Enter Number Prefix or Pattern",
+        placeholder="+91 98XXXXXXXX or +9198",
+        key="block_pattern"
+    )
+    block_length = st.number_input(
+        "National number length (0 = use the country's mobile length or the pattern)",
+        min_value=0, max_value=15, value=0, key="block_length"
+    )
+
+    if st.button("Analyse Block", type="primary"):
+        import pandas as pd
+        if block_pattern:
+            try:
+                block = analyse_number_block(block_pattern, national_length=int(block_length) or None)
+            except ValueError as e:
+                st.error(f"Invalid block: {str(e)}")
+            else:
+                block_rows = pd.DataFrame(block["rows"])
+
+                col_b1, col_b2, col_b3 = st.columns(3)
+                col_b1.metric("Block", block["pattern"])
+                col_b2.metric("Numbers", f"{block['total_numbers']:,}")
+                col_b3.metric("Estimated Valid", f"{int(block_rows['estimated_valid'].sum()):,}")
+
+                st.markdown("### Sub-prefixes")
+                st.dataframe(block_rows, hide_index=True)
+                st.caption("Validity is estimated from sample numbers in each sub-prefix.")
+
+                col_a1, col_a2, col_a3 = st.columns(3)
+                with col_a1:
+                    st.markdown("**By Carrier**")
+                    st.dataframe(pd.DataFrame(block["by_carrier"]), hide_index=True)
+                with col_a2:
+                    st.markdown("**By Region**")
+                    st.dataframe(pd.DataFrame(block["by_geo"]), hide_index=True)
+                with col_a3:
+                    st.markdown("**By Timezone**")
+                    st.dataframe(pd.DataFrame(block["by_timezone"]), hide_index=True)
+
+                st.download_button(
+                    label="📥 Download Block Summary (CSV)",
+                    data=block_rows.to_csv(index=False),
+                    file_name=f"number_block_{block['pattern'].lstrip('+')}.csv",
+                    mime="text/csv"
+                )
+        else:
+            st.warning("Please enter a number prefix.")
+
+def watchlist_tab():
+    st.subheader("Watch Numbers and IPs for Changes")
+    scheduler = get_watchlist_scheduler()
+    watchlist = scheduler.watchlist
+
+    col_w1, col_w2 = st.columns([1, 2])
+    with col_w1:
+        watch_kind = st.radio("Type", WATCH_KINDS, format_func=lambda kind: "Phone number" if kind == "phone" else "IP address",
+                              key="watch_kind")
+    with col_w2:
+        watch_values = st.text_area("Values to watch (one per line)", placeholder="+919876543210\n8.8.8.8",
+                                    key="watch_values")
+
+    if st.button("Add to Watchlist"):
+        added = sum(watchlist.add(watch_kind, value) for value in watch_values.splitlines() if value.strip())
+        st.success(f"Added {added} new entr{'y' if added == 1 else 'ies'}.")
+
+    background = st.toggle("Background re-enrichment", value=scheduler.running,
+                           help="Re-check the stalest due entries within the lookup budget")
+    if background and not scheduler.running:
+        scheduler.start()
+    elif not background and scheduler.running:
+        scheduler.stop()
+    if background and scheduler.last_error:
+        st.warning(f"Last background run failed: {scheduler.last_error}")
+
+    refresh_budget = st.number_input("Lookups for a manual run", min_value=1, max_value=500, value=20,
+                                     key="watch_budget")
+    if st.button("Re-enrich Due Entries Now", type="primary"):
+        session_id, client_id = streamlit_identity()
+        controller = get_admission_controller()
+        refresh_rejections = []
+
+        def admit_refresh():
+            try:
+                controller.admit(session_id, client_id)
+                return True
+            except AdmissionRejected as e:
+                refresh_rejections.append(e)
+                return False
+
+        run = watchlist.run_once(int(refresh_budget), acquire=admit_refresh,
+                                 slot=lambda: controller.queued(session_id))
+        st.info(f"Checked {run['checked']} entries, {run['changed']} changed.")
+        if refresh_rejections:
+            show_rejection(refresh_rejections[0])
+
+    watch_entries = watchlist.entries()
+    if watch_entries:
+        import pandas as pd
+        st.markdown("### Entries")
+        entries_table = pd.DataFrame(watch_entries)
+        for column in ("added_at", "last_checked", "last_changed"):
+            entries_table[column] = pd.to_datetime(entries_table[column], unit="s")
+        st.dataframe(entries_table, hide_index=True)
+
+        last_run = watchlist.last_run()
+        st.markdown("### Changes Since Last Run")
+        diffs = watchlist.last_run_diffs()
+        if diffs:
+            diffs_table = pd.DataFrame(diffs)
+            diffs_table["changed_at"] = pd.to_datetime(diffs_table["changed_at"], unit="s")
+            st.dataframe(diffs_table, hide_index=True)
+        elif last_run:
+            st.info(f"No changes in the last run ({last_run['checked']} entries checked).")
+        else:
+            st.info("No runs yet.")
+    else:
+        st.info("The watchlist is empty.")
+
+def correlation_tab():
+    st.subheader("Correlate Phone Numbers with IP Addresses")
+
+    pairs_text = st.text_area(
+        "Enter phone/IP pairs (one pair per line)",
+        placeholder="+919876543210, 49.205.0.1\n+442079460958, 8.8.8.8",
+        key="correlation_pairs"
+    )
+
+    if st.button("Correlate", type="primary"):
+        import pandas as pd
+        from correlation import parse_pairs, correlate_pairs
+        pairs = parse_pairs(pairs_text)
+        if pairs:
+            correlation_rejections = []
+            correlated = correlate_pairs(pairs, phone_lookup=admitted_batch(get_phone_info, correlation_rejections),
+                                         ip_lookup=admitted_batch(get_ip_info, correlation_rejections))
+            if correlation_rejections:
+                show_rejection(correlation_rejections[0])
+            col_c1, col_c2, col_c3 = st.columns(3)
+            with col_c1:
+                st.metric("Pairs", len(correlated))
+            with col_c2:
+                st.metric("Timezone Mismatches", sum(row["timezone_mismatch"] for row in correlated))
+            with col_c3:
+                scored = [row["consistency"] for row in correlated if row["consistency"] is not None]
+                st.metric("Median Consistency", f"{sorted(scored)[len(scored) // 2]:.0f}" if scored else "N/A")
+
+            # Least consistent pairs first; every column can be re-sorted in the table
+            st.markdown("### Pairs")
+            correlation_table = pd.DataFrame(correlated)[[
+                "phone", "ip", "consistency", "distance_km", "timezone_mismatch",
+                "phone_location", "ip_location", "phone_timezone", "ip_timezone"
+            ]].sort_values("consistency", na_position="last")
+            st.dataframe(correlation_table, hide_index=True)
+            st.download_button(
+                label="📥 Download CSV",
+                data=correlation_table.to_csv(index=False),
+                file_name="phone_ip_correlation.csv",
+                mime="text/csv"
+            )
+
+            correlation_map = get_correlation_map(correlated)
+            if correlation_map:
+                st.markdown("### 🗺️ Correlation Map")
+                components.html(correlation_map._repr_html_(), height=450)
+        else:
+            st.warning("Please enter at least one phone/IP pair.")
+
+def batch_export_tab():
+    st.subheader("Export Lookups for GIS Tools")
+
+    export_kind = st.radio("Input type", sorted(RECORD_TYPES), key="export_kind",
+                           format_func=lambda kind: "Phone numbers" if kind == "phone" else "IP addresses")
+    export_values = st.text_area("Values (one per line)", key="export_values",
+                                 placeholder="+919876543210\n+442079460958")
+
+    if st.button("Look Up Batch", type="primary"):
+        values = [value.strip() for value in export_values.splitlines() if value.strip()]
+        if values:
+            # Keep the batch in the compact columnar table rather than as dicts
+            table = ResultsTable(RECORD_TYPES[export_kind])
+            progress = st.progress(0.0)
+            lookup = admitted_batch(get_phone_info if export_kind == "phone" else get_ip_info)
+            try:
+                for index, record in enumerate(lookup_records(values, export_kind, lookup=lookup), start=1):
+                    table.append(record)
+                    progress.progress(index / len(values))
+            except AdmissionRejected as e:
+                # Keep the records looked up before the limit was reached
+                show_rejection(e)
+            st.session_state.export_table = (export_kind, table)
+        else:
+            st.warning("Please enter at least one value.")
+
+    if st.session_state.export_table:
+        import pandas as pd
+        table_kind, table = st.session_state.export_table
+        st.markdown(f"### {len(table):,} Results")
+        st.dataframe(pd.DataFrame([table.row(index) for index in range(min(len(table), 100))]), hide_index=True)
+
+        export_format = st.selectbox("Format", list(EXPORT_FORMATS),
+                                     format_func=lambda name: name.upper() if name != "geojson" else "GeoJSON",
+                                     key="export_format")
+        _, export_mime, export_extension = EXPORT_FORMATS[export_format]
+
+        def export_data(table=table, export_format=export_format, table_kind=table_kind):
+            # Built only when the button is clicked, not on every rerun
+            return b"".join(export((table.row(index) for index in range(len(table))), export_format, table_kind))
+
+        st.download_button(
+            label=f"📥 Download {export_extension[1:].upper()}",
+            data=export_data,
+            file_name=f"tamizh_{table_kind}_lookups{export_extension}",
+            mime=export_mime
+        )
+
+def report_archive_tab():
+    st.subheader("Search Archived Reports")
+
+    col_a1, col_a2, col_a3 = st.columns(3)
+    with col_a1:
+        archive_subject = st.text_input("Phone number or IP", key="archive_subject")
+        archive_kind = st.selectbox("Report type", ["All", "phone", "ip"], key="archive_kind")
+    with col_a2:
+        archive_country = st.text_input("Country", key="archive_country")
+        archive_carrier = st.text_input("Carrier / ISP", key="archive_carrier")
+    with col_a3:
+        archive_dates = st.date_input("Generated between", value=(), key="archive_dates")
+        archive_format = st.selectbox("Format", ["All", *REPORT_FORMATS], key="archive_format")
+
+    if not ARCHIVE_ENABLED:
+        st.info("Report archiving is disabled (TAMIZH_ARCHIVE_REPORTS=0).")
+    elif st.button("Search Archive", type="primary"):
+        since = until = None
+        if len(archive_dates) == 2:
+            since = datetime.combine(archive_dates[0], datetime.min.time()).timestamp()
+            until = datetime.combine(archive_dates[1], datetime.max.time()).timestamp()
+        st.session_state.archive_results = get_report_archive().search(
+            kind=None if archive_kind == "All" else archive_kind,
+            subject=archive_subject.strip() or None,
+            country=archive_country.strip() or None,
+            carrier=archive_carrier.strip() or None,
+            report_format=None if archive_format == "All" else archive_format,
+            since=since,
+            until=until,
+            limit=500
+        )
+
+    archive_results = st.session_state.get("archive_results")
+    if archive_results:
+        import pandas as pd
+        archive_table = pd.DataFrame(archive_results)
+        archive_table["created_at"] = pd.to_datetime(archive_table["created_at"], unit="s")
+        st.dataframe(archive_table, hide_index=True)
+
+        report_id = st.selectbox("Report", [row["id"] for row in archive_results], key="archive_report_id")
+        selected = next(row for row in archive_results if row["id"] == report_id)
+        archived = b"".join(get_report_archive().stream_report(report_id))
+        if selected["format"] == "text":
+            st.text(archived.decode("utf-8"))
+        st.download_button(
+            label="📥 Download Archived Report",
+            data=archived,
+            file_name=f"{selected['kind']}_report_{selected['subject']}_{report_id}"
+                      f"{'.pdf' if selected['format'] == 'pdf' else '.txt'}",
+            mime="application/pdf" if selected["format"] == "pdf" else "text/plain"
+        )
+    elif archive_results is not None:
+        st.info("No archived reports match.")
+
+# Label, render function and input keys of each main tab, in display order
+TABS = [
+    ("📞 Phone Number Lookup", phone_lookup_tab,
+     ("phone_country", "phone_auto_detect", "phone_number", "phone_batch")),
+    ("🌐 IP Address Lookup", ip_lookup_tab,
+     ("ip_address",)),
+    ("📜 Log Stream", log_stream_tab,
+     ("log_path", "log_follow", "log_seconds", "log_workers")),
+    ("🧭 IP Range Lookup", ip_range_tab,
+     ("range_queries", "range_max_queries")),
+    ("🔢 Number Blocks", number_block_tab,
+     ("block_pattern", "block_length")),
+    ("👁️ Watchlist", watchlist_tab,
+     ("watch_kind", "watch_values", "watch_budget")),
+    ("🔗 Phone ↔ IP Correlation", correlation_tab,
+     ("correlation_pairs",)),
+    ("📦 Batch Export", batch_export_tab,
+     ("export_kind", "export_values", "export_format")),
+    ("🗄️ Report Archive", report_archive_tab,
+     ("archive_subject", "archive_kind", "archive_country", "archive_carrier", "archive_dates",
+      "archive_format", "archive_report_id")),
+]
@@ -0,0 +1,71 @@
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+from correlation import correlate_pairs
+from ip_ranges import analyse_ip_ranges
+
+
+def fake_info(ip):
+    # Shaped like both an IP and a phone lookup; a different city per /24 so sub-ranges are not merged
+    return {"country": "Testland", "region": "Test", "state": "Test", "city": ip.rsplit(".", 1)[0], "asn": "AS64500",
+            "org": "Test Org", "latitude": 10.0, "longitude": 20.0, "timezone": "UTC"}
+
+
+def test_batch_larger_than_the_interactive_burst_is_admitted():
+    controller = AdmissionController()
+    lookup = controller.batch_lookup(fake_info, "session", "client")
+
+    # 32 /24 lookups, well past the interactive burst of 5
+    rows = analyse_ip_ranges(["203.0.96.0/19"], lookup=lookup)
+
+    assert len(rows) == 32
+    assert all(row["status"] == "ok" for row in rows)
+    assert controller.metrics()["admitted"] == 32
+    assert controller.metrics()["rejected_session"] == 0
+
+
+def test_batch_budget_does_not_spend_interactive_tokens():
+    controller = AdmissionController()
+    lookup = controller.batch_lookup(fake_info, "session", "client")
+    for index in range(20):
+        lookup(f"198.51.100.{index}")
+
+    controller.admit("session", "client")
+
+
+def test_exhausted_batch_budget_raises_without_rejections_list():
+    controller = AdmissionController(session_batch_lookups_per_hour=3)
+    lookup = controller.batch_lookup(fake_info, "session", "client")
+    for index in range(3):
+        lookup(f"198.51.100.{index}")
+
+    with pytest.raises(AdmissionRejected):
+        lookup("198.51.100.3")
+
+
+def test_exhausted_batch_budget_keeps_partial_ranges():
+    controller = AdmissionController(session_batch_lookups_per_hour=8)
+    rejections = []
+    lookup = controller.batch_lookup(fake_info, "session", "client", rejections)
+
+    rows = analyse_ip_ranges(["203.0.96.0/20"], lookup=lookup)
+
+    assert [row["status"] for row in rows] == ["ok"] * 8 + ["skipped"]
+    assert rows[-1]["addresses"] == 8 * 256
+    assert len(rejections) == 1
+    assert rejections[0].reason == "Session batch"
+
+
+def test_exhausted_batch_budget_keeps_partial_correlation():
+    controller = AdmissionController(session_batch_lookups_per_hour=7)
+    rejections = []
+    lookup = controller.batch_lookup(fake_info, "session", "client", rejections)
+    pairs = [(f"+4420794609{index:02d}", f"198.51.{index}.1") for index in range(6)]
+
+    rows = correlate_pairs(pairs, phone_lookup=lookup, ip_lookup=lookup)
+
+    # All 6 phones and the first IP were looked up; the other pairs keep their row without a score
+    assert len(rows) == 6
+    assert rows[0]["consistency"] is not None
+    assert all(row["consistency"] is None and row["ip_location"] == "" for row in rows[1:])
+    assert len(rejections) == 1
@@ -0,0 +1,25 @@
+from benchmarks.run import compare
+
+
+def test_small_latency_regression_is_flagged():
+    # 1.4 ms -> 4 ms is nearly three times slower, although it is under 5 ms
+    baseline = {"get_ip_info": {"calls": 1000, "p50_ms": 1.4, "throughput": 700.0}}
+    results = {"get_ip_info": {"calls": 1000, "p50_ms": 4.0, "throughput": 250.0}}
+
+    assert len(compare(results, baseline, tolerance=0.2, min_delta_ms=0.05)) == 2
+
+
+def test_timer_noise_on_sub_microsecond_calls_is_ignored():
+    baseline = {"generate_report": {"calls": 1000, "p50_ms": 0.0005, "p99_ms": 0.0008}}
+    results = {"generate_report": {"calls": 1000, "p50_ms": 0.002, "p99_ms": 0.01}}
+
+    assert compare(results, baseline, tolerance=0.2, min_delta_ms=0.05) == []
+
+
+def test_p99_is_gated_only_with_enough_calls():
+    baseline = {"load": {"p50_ms": 190.0, "p99_ms": 400.0}}
+    results = {"load": {"calls": 24, "p50_ms": 190.0, "p99_ms": 900.0}}
+
+    assert compare(results, baseline, tolerance=0.2, min_delta_ms=0.05) == []
+    results["load"]["calls"] = 1000
+    assert compare(results, baseline, tolerance=0.2, min_delta_ms=0.05) == ["load.p99_ms: 900 > baseline 400"]
@@ -0,0 +1,26 @@
+import utils
+from results import IPResult
+
+
+def test_ipapi_error_flag_is_an_error_result(monkeypatch):
+    monkeypatch.setattr(utils, "fetch_ip_json", lambda ip: {
+        "status_code": 200, "data": {"ip": ip, "error": True, "reason": "Reserved IP Address", "reserved": True},
+    })
+
+    result = IPResult.from_info(utils.get_ip_info("10.0.0.1"))
+
+    assert result.status == "error"
+    assert result.error == "Reserved IP Address"
+    assert result.country is None
+
+
+def test_successful_lookup_has_no_error(monkeypatch):
+    monkeypatch.setattr(utils, "fetch_ip_json", lambda ip: {
+        "status_code": 200, "data": {"ip": ip, "country_name": "United States", "latitude": 37.4, "longitude": -122.1},
+    })
+
+    result = IPResult.from_info(utils.get_ip_info("8.8.8.8"))
+
+    assert result.status == "ok"
+    assert result.error is None
+    assert result.country == "United States"
@@ -0,0 +1,26 @@
+import pytest
+
+from log_ingest import extract_ips, resolve_log_path
+
+
+@pytest.mark.parametrize("line, expected", [
+    # IPv4-mapped IPv6 is reported as the IPv4 address, not truncated to "::ffff:8"
+    ("client ::ffff:8.8.4.4 connected", ["8.8.4.4"]),
+    ("2001:4860:4860::8888 at 12:30:45", ["2001:4860:4860::8888"]),
+])
+def test_extract_ips(line, expected):
+    assert extract_ips(line) == expected
+
+
+def test_resolve_log_path_stays_inside_log_dir(tmp_path):
+    log_dir = tmp_path / "logs"
+    log_dir.mkdir()
+    (log_dir / "access.log").write_text("")
+    (tmp_path / "secret").write_text("")
+    (log_dir / "link.log").symlink_to(tmp_path / "secret")
+
+    assert resolve_log_path("access.log", str(log_dir)) == str(log_dir / "access.log")
+    assert resolve_log_path(str(log_dir / "access.log"), str(log_dir)) == str(log_dir / "access.log")
+    for path in ("../secret", str(tmp_path / "secret"), "link.log", "/etc/passwd"):
+        with pytest.raises(ValueError):
+            resolve_log_path(path, str(log_dir))
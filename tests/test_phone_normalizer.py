@@ -0,0 +1,20 @@
+import pytest
+
+from phone_normalizer import normalize_number
+
+
+@pytest.mark.parametrize("raw, region, expected", [
+    # Trunk-prefixed UK numbers, not the "011" North American exit code
+    ("0113 496 0000", "GB", "+441134960000"),
+    ("0117 946 0000", "GB", "+441179460000"),
+    ("011 44 20 7946 0958", "US", "+442079460958"),
+    ("00 91 98765 43210", "GB", "+919876543210"),
+    ("011 91 98765 43210", None, "+919876543210"),
+    # A common access prefix that is not the default region's own
+    ("0044 20 7946 0958", "US", "+442079460958"),
+    ("011 91 98765 43210", "GB", "+919876543210"),
+])
+def test_normalize_number(raw, region, expected):
+    result = normalize_number(raw, region)
+    assert result["is_valid"]
+    assert result["e164"] == expected
@@ -0,0 +1,13 @@
+from report_archive import ReportArchive
+
+
+def test_iter_search_pages_in_created_at_order(tmp_path):
+    archive = ReportArchive(str(tmp_path / "archive.sqlite"))
+    # Imported out of order, so ids do not follow created_at
+    created = [1050.0, 1010.0, 1040.0, 1020.0, 1030.0, 1060.0, 1000.0]
+    archive.add_many([{"kind": "ip", "format": "text", "subject": "8.8.8.8", "payload": b"report",
+                       "created_at": created_at} for created_at in created])
+
+    rows = list(archive.iter_search(page_size=2))
+
+    assert [row["created_at"] for row in rows] == sorted(created, reverse=True)
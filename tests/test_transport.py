@@ -0,0 +1,48 @@
+import pytest
+
+import utils
+from transport import FixtureStore, LatencyModel, Transport
+
+
+@pytest.mark.parametrize("spec", [
+    "fixed", "uniform", "uniform:5", "lognormal:80", "recorded:1,2", "fixed:abc", "fixed:-1",
+    "uniform:9,3", "lognormal:0,0.5", "gaussian:1",
+])
+def test_invalid_latency_specs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        LatencyModel(spec)
+
+
+@pytest.mark.parametrize("spec, recorded_ms, expected_ms", [
+    ("", 40.0, 0.0),
+    ("recorded", 40.0, 40.0),
+    ("recorded:0.5", 40.0, 20.0),
+    ("fixed:12", 40.0, 12.0),
+    ("uniform:3,3", 40.0, 3.0),
+])
+def test_latency_samples(spec, recorded_ms, expected_ms):
+    assert LatencyModel(spec).sample_ms(recorded_ms) == expected_ms
+
+
+def test_ip_cache_key_matches_the_requested_address(monkeypatch, tmp_path):
+    requested = []
+
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"ip": "2001:db8::1"}
+
+    def fake_get(url):
+        requested.append(url)
+        return Response()
+
+    import requests
+    monkeypatch.setattr(requests, "get", fake_get)
+    store = FixtureStore(str(tmp_path / "fixtures.sqlite"))
+    monkeypatch.setattr(utils, "get_transport", lambda: Transport("record", store))
+
+    utils.fetch_ip_json(" 2001:DB8::1 ")
+
+    assert requested == [f"{utils.IPAPI_BASE_URL}/2001:db8::1/json/"]
+    assert store.get("ipapi", "2001:db8::1") is not None
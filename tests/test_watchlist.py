@@ -0,0 +1,66 @@
+import threading
+import time
+
+from admission import AdmissionController, AdmissionRejected
+from watchlist import Watchlist, WatchlistScheduler
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_scheduler_lookups_go_through_the_admission_controller(tmp_path):
+    looked_up = []
+    watchlist = Watchlist(str(tmp_path / "watchlist.sqlite"),
+                          enrichers={"ip": lambda ip: looked_up.append(ip) or {"status": "ok", "ip": ip}})
+    for index in range(10):
+        watchlist.add("ip", f"198.51.100.{index}")
+    controller = AdmissionController()
+
+    def admit():
+        try:
+            controller.admit("scheduler", "scheduler")
+            return True
+        except AdmissionRejected:
+            return False
+
+    scheduler = WatchlistScheduler(watchlist, admit=admit, slot=lambda: controller.queued("scheduler"))
+    scheduler.start()
+    wait_for(lambda: scheduler.last_result is not None)
+    scheduler.stop(timeout=5.0)
+
+    # The session burst of 5 caps the run, not the scheduler's own budget of 30
+    assert len(looked_up) == 5
+    assert controller.metrics()["admitted"] == 5
+    assert controller.metrics()["rejected_session"] == 1
+
+
+def test_stop_does_not_wait_for_a_running_lookup(tmp_path):
+    started, release = threading.Event(), threading.Event()
+    looked_up = []
+
+    def slow_lookup(ip):
+        looked_up.append(ip)
+        started.set()
+        release.wait(5.0)
+        return {"status": "ok", "ip": ip}
+
+    watchlist = Watchlist(str(tmp_path / "watchlist.sqlite"), enrichers={"ip": slow_lookup})
+    for index in range(3):
+        watchlist.add("ip", f"198.51.100.{index}")
+    scheduler = WatchlistScheduler(watchlist)
+    scheduler.start()
+    assert started.wait(5.0)
+
+    stop_started = time.monotonic()
+    scheduler.stop()
+    assert time.monotonic() - stop_started < 0.5
+    assert not scheduler.running
+
+    # The lookup in flight finishes, and no further lookup starts
+    release.set()
+    wait_for(lambda: scheduler.last_result is not None)
+    assert looked_up == ["198.51.100.0"]
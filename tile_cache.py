@@ -0,0 +1,365 @@
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ratelimit import TokenBucket
+
+# Tile URL the maps load from; empty means browsers fetch OpenStreetMap directly
+TILE_PROXY_URL = os.environ.get("TAMIZH_TILE_PROXY", "").rstrip("/")
+
+# Start a proxy inside the Streamlit process, listening on the port of TILE_PROXY_URL
+TILE_PROXY_EMBED = os.environ.get("TAMIZH_TILE_PROXY_EMBED", "0") != "0"
+# Address the embedded proxy listens on; set 0.0.0.0 only if browsers on other hosts must reach it
+TILE_PROXY_HOST = os.environ.get("TAMIZH_TILE_PROXY_HOST", "127.0.0.1")
+
+TILE_UPSTREAM = os.environ.get("TAMIZH_TILE_UPSTREAM", "https://tile.openstreetmap.org/{z}/{x}/{y}.png")
+TILE_CACHE_DIR = os.environ.get("TAMIZH_TILE_CACHE_DIR", "tile_cache")
+TILE_CACHE_MAX_MB = float(os.environ.get("TAMIZH_TILE_CACHE_MB", "512"))
+
+# Regions seeded ahead of time, as "south,west,north,east" boxes separated by ";"
+TILE_SEED_REGIONS = os.environ.get("TAMIZH_TILE_SEED_REGIONS", "6,68,36,98")
+# Zoom the phone and IP location maps open at
+LOCATION_MAP_ZOOM = 8
+# Zooms the embedded proxy seeds at startup; empty seeds nothing. "2-6,8" also covers
+# LOCATION_MAP_ZOOM so a lookup's first view is a cache hit, and is what the seed command uses
+DEFAULT_SEED_ZOOMS = f"2-6,{LOCATION_MAP_ZOOM}"
+TILE_SEED_ZOOMS = os.environ.get("TAMIZH_TILE_SEED_ZOOMS", "")
+
+# Upstream tile fetches per second; OSM's tile policy forbids bulk downloading
+UPSTREAM_TILES_PER_SECOND = float(os.environ.get("TAMIZH_TILE_RATE", "2"))
+
+TILE_ATTRIBUTION = '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
+USER_AGENT = "tamizh-AI tile cache | S.Tamilselvan"
+MAX_ZOOM = 19
+
+Tile = Tuple[int, int, int]
+
+
+def tile_url_template() -> Optional[str]:
+    """
+    Leaflet URL template for the proxy, or None when maps should use the default tiles
+    """
+    return f"{TILE_PROXY_URL}/{{z}}/{{x}}/{{y}}.png" if TILE_PROXY_URL else None
+
+
+def tile_for_point(latitude: float, longitude: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator (x, y) of the tile containing a point"""
+    latitude = max(min(latitude, 85.0511), -85.0511)
+    scale = 2 ** zoom
+    x = int((longitude + 180.0) / 360.0 * scale)
+    y = int((1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * scale)
+    return min(max(x, 0), scale - 1), min(max(y, 0), scale - 1)
+
+
+def tiles_for_bbox(south: float, west: float, north: float, east: float, zoom: int) -> Iterator[Tile]:
+    """Every tile covering a bounding box at one zoom level"""
+    x_min, y_min = tile_for_point(north, west, zoom)
+    x_max, y_max = tile_for_point(south, east, zoom)
+    for x in range(x_min, x_max + 1):
+        for y in range(y_min, y_max + 1):
+            yield zoom, x, y
+
+
+def parse_regions(spec: str) -> List[Tuple[float, float, float, float]]:
+    """Parse "south,west,north,east;..." boxes"""
+    regions = []
+    for box in spec.split(";"):
+        if box.strip():
+            south, west, north, east = (float(value) for value in box.split(","))
+            regions.append((south, west, north, east))
+    return regions
+
+
+def parse_zooms(spec: str) -> List[int]:
+    """Parse zoom lists such as "2-6,8" """
+    zooms = set()
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition("-")
+        zooms.update(range(int(low), int(high or low) + 1))
+    return sorted(zoom for zoom in zooms if 0 <= zoom <= MAX_ZOOM)
+
+
+class TileCache:
+    """
+    On-disk tile store with least-recently-used eviction once it grows past max_bytes.
+    File modification times record use, so the LRU order survives restarts.
+    """
+
+    def __init__(self, directory: str = TILE_CACHE_DIR, max_bytes: int = int(TILE_CACHE_MAX_MB * 1024 * 1024)):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tile, int]" = OrderedDict()
+        self._size = 0
+        self._load()
+
+    def _path(self, tile: Tile) -> str:
+        zoom, x, y = tile
+        return os.path.join(self.directory, str(zoom), str(x), f"{y}.png")
+
+    def _load(self):
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".png"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    zoom, x = (int(part) for part in os.path.relpath(root, self.directory).split(os.sep))
+                    stat = os.stat(path)
+                except (ValueError, OSError):
+                    continue
+                found.append((stat.st_mtime, (zoom, x, int(name[:-4])), stat.st_size))
+        for _, tile, size in sorted(found):
+            self._entries[tile] = size
+            self._size += size
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, tile: Tile) -> bool:
+        return tile in self._entries
+
+    def get(self, tile: Tile) -> Optional[bytes]:
+        with self._lock:
+            if tile not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(tile)
+            self.hits += 1
+        path = self._path(tile)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                self._size -= self._entries.pop(tile, 0)
+            return None
+
+    def put(self, tile: Tile, data: bytes):
+        path = self._path(tile)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial tile
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+        with self._lock:
+            self._size += len(data) - self._entries.pop(tile, 0)
+            self._entries[tile] = len(data)
+            evicted = []
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                old_tile, old_size = self._entries.popitem(last=False)
+                self._size -= old_size
+                evicted.append(old_tile)
+        for old_tile in evicted:
+            try:
+                os.remove(self._path(old_tile))
+            except OSError:
+                pass
+
+
+class TileProxy:
+    """
+    Serves tiles from the cache, fetching misses upstream at most once per tile at a time
+    """
+
+    def __init__(self, cache: Optional[TileCache] = None, upstream: str = TILE_UPSTREAM,
+                 tiles_per_second: float = UPSTREAM_TILES_PER_SECOND):
+        self.cache = cache if cache is not None else TileCache()
+        self.upstream = upstream
+        self.budget = TokenBucket(rate=tiles_per_second, capacity=max(1.0, tiles_per_second))
+        self.upstream_fetches = 0
+        self._session = None
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def _fetch_upstream(self, tile: Tile) -> bytes:
+        import requests
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers["User-Agent"] = USER_AGENT
+
+        while not self.budget.try_acquire():
+            time.sleep(self.budget.wait_time())
+        zoom, x, y = tile
+        response = self._session.get(self.upstream.format(z=zoom, x=x, y=y), timeout=10)
+        response.raise_for_status()
+        self.upstream_fetches += 1
+        return response.content
+
+    def get(self, tile: Tile) -> bytes:
+        data = self.cache.get(tile)
+        if data is not None:
+            return data
+
+        # Concurrent requests for the same missing tile wait for a single upstream fetch
+        with self._lock:
+            tile_lock = self._in_flight.setdefault(tile, threading.Lock())
+        with tile_lock:
+            data = self.cache.get(tile)
+            if data is None:
+                data = self._fetch_upstream(tile)
+                self.cache.put(tile, data)
+        with self._lock:
+            self._in_flight.pop(tile, None)
+        return data
+
+    def seed(self, regions: List[Tuple[float, float, float, float]], zooms: List[int],
+             max_tiles: int = 5000) -> int:
+        """
+        Fetch every uncached tile for the regions and zooms, returning how many were fetched
+        """
+        fetched = 0
+        for zoom in zooms:
+            for region in regions:
+                for tile in tiles_for_bbox(*region, zoom):
+                    if tile in self.cache:
+                        continue
+                    if fetched >= max_tiles:
+                        return fetched
+                    try:
+                        self.get(tile)
+                    except Exception:
+                        # Upstream unreachable or refusing; tiles will be fetched on demand instead
+                        return fetched
+                    fetched += 1
+        return fetched
+
+
+class TileServer:
+    """Threaded HTTP server answering `/<z>/<x>/<y>.png` from a TileProxy"""
+
+    def __init__(self, proxy: Optional[TileProxy] = None, host: str = "127.0.0.1", port: int = 0):
+        self.proxy = proxy or TileProxy()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    def _handler_class(self):
+        proxy = self.proxy
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = [part for part in urlparse(self.path).path.split("/") if part]
+                try:
+                    zoom, x, y = (int(part.removesuffix(".png")) for part in parts)
+                    if not 0 <= zoom <= MAX_ZOOM or not 0 <= x < 2 ** zoom or not 0 <= y < 2 ** zoom:
+                        raise ValueError
+                except ValueError:
+                    self.send_error(404)
+                    return
+
+                try:
+                    data = proxy.get((zoom, x, y))
+                except Exception:
+                    self.send_error(502)
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("Cache-Control", "public, max-age=604800")
+                self.send_header("Access-Control-Allow-Origin", "*")
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "TileServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="tamizh-tiles", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def start_embedded_proxy(seed: bool = True) -> Optional[TileServer]:
+    """
+    Start a tile server on TILE_PROXY_HOST and the port of TILE_PROXY_URL, seeding the
+    configured regions in the background when TILE_SEED_ZOOMS is set
+    """
+    if not TILE_PROXY_URL:
+        return None
+    port = urlparse(TILE_PROXY_URL).port or 80
+    server = TileServer(host=TILE_PROXY_HOST, port=port).start()
+    zooms = parse_zooms(TILE_SEED_ZOOMS)
+    if seed and zooms:
+        threading.Thread(
+            target=server.proxy.seed,
+            args=(parse_regions(TILE_SEED_REGIONS), zooms),
+            name="tamizh-tile-seed",
+            daemon=True
+        ).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Caching OpenStreetMap tile proxy for the map views")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    serve = subcommands.add_parser("serve", help="Serve cached tiles over HTTP")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--seed", action="store_true", help="Seed the configured regions first")
+
+    seed = subcommands.add_parser("seed", help="Fetch tiles for regions and zooms into the cache")
+    seed.add_argument("--regions", default=TILE_SEED_REGIONS, help='"south,west,north,east;..."')
+    seed.add_argument("--zooms", default=TILE_SEED_ZOOMS or DEFAULT_SEED_ZOOMS, help='e.g. "2-6,8"')
+    seed.add_argument("--max-tiles", type=int, default=5000)
+
+    for subcommand in (serve, seed):
+        subcommand.add_argument("--cache-dir", default=TILE_CACHE_DIR)
+        subcommand.add_argument("--cache-mb", type=float, default=TILE_CACHE_MAX_MB)
+    args = parser.parse_args()
+
+    proxy = TileProxy(TileCache(args.cache_dir, int(args.cache_mb * 1024 * 1024)))
+    if args.command == "seed" or args.seed:
+        regions = parse_regions(getattr(args, "regions", TILE_SEED_REGIONS))
+        zooms = parse_zooms(getattr(args, "zooms", TILE_SEED_ZOOMS or DEFAULT_SEED_ZOOMS))
+        fetched = proxy.seed(regions, zooms, getattr(args, "max_tiles", 5000))
+        print(f"Seeded {fetched} tiles; cache holds {len(proxy.cache)} tiles "
+              f"({proxy.cache.size_bytes / 1024 / 1024:.1f} MiB)", file=sys.stderr)
+        if args.command == "seed":
+            return
+
+    server = TileServer(proxy, args.host, args.port).start()
+    print(f"Serving tiles on http://{server.address}/{{z}}/{{x}}/{{y}}.png", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
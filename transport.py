@@ -0,0 +1,183 @@
+import json
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Optional, Tuple
+
+# live: always call upstream; record: call upstream and store the response;
+# replay: serve only stored responses; cache: serve stored responses, fall back to upstream
+TRANSPORT_MODES = ("live", "record", "replay", "cache")
+
+TRANSPORT_MODE = os.environ.get("TAMIZH_TRANSPORT", "live")
+FIXTURE_STORE_PATH = os.environ.get("TAMIZH_FIXTURE_STORE", "upstream_fixtures.sqlite")
+REPLAY_LATENCY = os.environ.get("TAMIZH_REPLAY_LATENCY", "")
+CACHE_TTL_SECONDS = float(os.environ.get("TAMIZH_CACHE_TTL", "0"))
+
+
+class ReplayMiss(KeyError):
+    """Raised in replay mode when no response was recorded for a request"""
+
+
+class FixtureStore:
+    """
+    Compact SQLite store of normalized upstream responses, indexed by (service, key)
+    """
+
+    def __init__(self, path: str = FIXTURE_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                service TEXT NOT NULL,
+                key TEXT NOT NULL,
+                body BLOB NOT NULL,
+                latency_ms REAL NOT NULL,
+                recorded_at REAL NOT NULL,
+                PRIMARY KEY (service, key)
+            ) WITHOUT ROWID
+            """
+        )
+        self._connection.commit()
+
+    def get(self, service: str, key: str) -> Optional[Tuple[Any, float, float]]:
+        """Return (body, recorded latency in ms, recorded_at) or None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body, latency_ms, recorded_at FROM responses WHERE service = ? AND key = ?",
+                (service, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0])), row[1], row[2]
+
+    def put(self, service: str, key: str, body: Any, latency_ms: float):
+        payload = zlib.compress(json.dumps(body, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (service, key, payload, latency_ms, time.time())
+            )
+            self._connection.commit()
+
+    def count(self, service: Optional[str] = None) -> int:
+        with self._lock:
+            if service:
+                return self._connection.execute(
+                    "SELECT COUNT(*) FROM responses WHERE service = ?", (service,)
+                ).fetchone()[0]
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class LatencyModel:
+    """
+    Simulated upstream latency for replayed responses.
+
+    Specs: "" (none), "recorded[:scale]", "fixed:ms", "uniform:low,high",
+    "lognormal:median,sigma".
+    """
+
+    # Number of arguments each model accepts
+    ARGUMENT_COUNTS = {"": (0,), "recorded": (0, 1), "fixed": (1,), "uniform": (2,), "lognormal": (2,)}
+
+    def __init__(self, spec: str = "", seed: Optional[int] = None):
+        self.kind, _, arguments = spec.partition(":")
+        if self.kind not in self.ARGUMENT_COUNTS:
+            raise ValueError(f"Unknown latency model: {spec}")
+        try:
+            self.arguments = [float(value) for value in arguments.split(",") if value.strip()]
+        except ValueError:
+            raise ValueError(f"Latency model arguments must be numbers: {spec}") from None
+        if len(self.arguments) not in self.ARGUMENT_COUNTS[self.kind]:
+            raise ValueError(f"Wrong number of arguments for latency model: {spec}")
+        if any(value < 0 or not math.isfinite(value) for value in self.arguments):
+            raise ValueError(f"Latency model arguments must be finite and non-negative: {spec}")
+        if self.kind == "uniform" and self.arguments[0] > self.arguments[1]:
+            raise ValueError(f"Uniform latency low bound exceeds high bound: {spec}")
+        if self.kind == "lognormal" and self.arguments[0] == 0:
+            raise ValueError(f"Lognormal latency median must be positive: {spec}")
+        self._random = random.Random(seed)
+
+    def sample_ms(self, recorded_ms: float) -> float:
+        if self.kind == "recorded":
+            return recorded_ms * (self.arguments[0] if self.arguments else 1.0)
+        if self.kind == "fixed":
+            return self.arguments[0]
+        if self.kind == "uniform":
+            return self._random.uniform(self.arguments[0], self.arguments[1])
+        if self.kind == "lognormal":
+            return self._random.lognormvariate(math.log(self.arguments[0]), self.arguments[1])
+        return 0.0
+
+
+class Transport:
+    """
+    Routes upstream calls through the fixture store according to the mode
+    """
+
+    def __init__(self, mode: str = TRANSPORT_MODE, store: Optional[FixtureStore] = None,
+                 latency: Optional[LatencyModel] = None, ttl_seconds: float = CACHE_TTL_SECONDS):
+        if mode not in TRANSPORT_MODES:
+            raise ValueError(f"Unknown transport mode: {mode}")
+        self.mode = mode
+        self.store = store if store is not None or mode == "live" else FixtureStore()
+        self.latency = latency or LatencyModel(REPLAY_LATENCY)
+        self.ttl_seconds = ttl_seconds
+
+    def fetch(self, service: str, key: str, live_call: Callable[[], Any],
+              cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the normalized response for a request, from the store or from live_call.
+        In cache mode only bodies accepted by cacheable are stored; record mode keeps every one.
+        """
+        if self.mode in ("replay", "cache"):
+            hit = self.store.get(service, key)
+            fresh = hit is not None and (
+                self.mode == "replay" or not self.ttl_seconds or time.time() - hit[2] <= self.ttl_seconds
+            )
+            if fresh:
+                delay_ms = self.latency.sample_ms(hit[1])
+                if delay_ms > 0:
+                    time.sleep(delay_ms / 1000)
+                return hit[0]
+            if self.mode == "replay":
+                raise ReplayMiss(f"No recorded {service} response for {key!r}")
+
+        started = time.perf_counter()
+        body = live_call()
+        if self.mode == "record" or (self.mode == "cache" and (cacheable is None or cacheable(body))):
+            self.store.put(service, key, body, (time.perf_counter() - started) * 1000)
+        return body
+
+
+_transport: Optional[Transport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> Transport:
+    """
+    Process-wide transport configured from the TAMIZH_* environment variables
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = Transport()
+        return _transport
+
+
+def set_transport(transport: Transport):
+    """
+    Replace the process-wide transport, e.g. to switch a benchmark to replay mode
+    """
+    global _transport
+    with _transport_lock:
+        _transport = transport
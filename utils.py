@@ -1,18 +1,21 @@
 import phonenumbers
-from phonenumbers import carrier, geocoder, timezone
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut
-import folium
 import streamlit as st
-from typing import Tuple, Dict, Optional
-from datetime import datetime
-from fpdf import FPDF
+from typing import TYPE_CHECKING, Tuple, Dict, List, Optional
 import tempfile
 import os
-import requests
-from typing import Dict, Optional
-import os
-import tempfile
+from results import NUMBER_TYPES
+from transport import get_transport
+
+# Rendering and network libraries are imported where they are used so that
+# starting the app does not pay for them before a map, PDF or lookup is needed
+if TYPE_CHECKING:
+    import folium
+    from fpdf import FPDF
+
+# Upstream endpoints, overridable to point at local stub servers
+IPAPI_BASE_URL = os.environ.get("IPAPI_BASE_URL", "https://ipapi.co")
+NOMINATIM_DOMAIN = os.environ.get("NOMINATIM_DOMAIN", "nominatim.openstreetmap.org")
+NOMINATIM_SCHEME = os.environ.get("NOMINATIM_SCHEME", "https")
 
 
 def validate_phone_number(phone_number: str, country_code: str) -> Tuple[bool, str]:
@@ -27,24 +30,41 @@ def validate_phone_number(phone_number: str, country_code: str) -> Tuple[bool, s
     except Exception as e:
         return False, str(e)
 
+def geocode_location(location_query: str) -> Optional[Dict]:
+    """
+    Geocode a free-text location through Nominatim, honouring the record/replay transport
+    """
+    # The stored response is keyed on exactly the query that is sent
+    query = " ".join(location_query.split()).casefold()
+
+    def live_call():
+        from geopy.geocoders import Nominatim
+        geolocator = Nominatim(user_agent="tamizh-AI | S.Tamilselvan",
+                               domain=NOMINATIM_DOMAIN, scheme=NOMINATIM_SCHEME)
+        location = geolocator.geocode(query, addressdetails=True)
+        if location is None:
+            return None
+        return {'latitude': location.latitude, 'longitude': location.longitude, 'raw': location.raw}
+
+    return get_transport().fetch("nominatim", query, live_call)
+
 def get_detailed_location(country: str, region: str = None) -> Dict[str, str]:
     """
     Get detailed location information including state and district if available
     """
     try:
-        geolocator = Nominatim(user_agent="tamizh-AI | S.Tamilselvan")
         location_query = f"{region}, {country}" if region and region != "Unknown" else country
-        location = geolocator.geocode(location_query, addressdetails=True)
+        location = geocode_location(location_query)
 
-        if location and location.raw.get('address'):
-            address = location.raw['address']
+        if location and location['raw'].get('address'):
+            address = location['raw']['address']
             return {
                 'country': address.get('country', country),
                 'state': address.get('state', region),
                 'district': address.get('county', address.get('district', 'Unknown')),
                 'city': address.get('city', address.get('town', address.get('village', 'Unknown'))),
-                'latitude': location.latitude,
-                'longitude': location.longitude
+                'latitude': location['latitude'],
+                'longitude': location['longitude']
             }
     except Exception as e:
         st.error(f"Error getting detailed location: {str(e)}")
@@ -63,6 +83,7 @@ def get_phone_info(phone_number: str) -> Dict[str, str]:
     Get detailed information about the phone number
     """
     try:
+        from phonenumbers import carrier, geocoder, timezone
         parsed_number = phonenumbers.parse(phone_number)
 
         # Get country
@@ -109,16 +130,30 @@ def get_phone_info(phone_number: str) -> Dict[str, str]:
             "longitude": None
         }
 
-def get_location_map(phone_info: Dict[str, str]) -> Optional[folium.Map]:
+def _base_map(location: List[float], zoom_start: int) -> "folium.Map":
+    """
+    Create a folium map, loading tiles through the local tile proxy when one is configured
+    """
+    import folium
+    from tile_cache import TILE_ATTRIBUTION, tile_url_template
+
+    tiles = tile_url_template()
+    if tiles:
+        return folium.Map(location=location, zoom_start=zoom_start, tiles=tiles, attr=TILE_ATTRIBUTION)
+    return folium.Map(location=location, zoom_start=zoom_start)
+
+def get_location_map(phone_info: Dict[str, str]) -> Optional["folium.Map"]:
     """
     Generate a detailed folium map with location information
     """
     try:
+        import folium
+        from tile_cache import LOCATION_MAP_ZOOM
         if phone_info["latitude"] and phone_info["longitude"]:
             # Create map centered on location
-            m = folium.Map(
-                location=[phone_info["latitude"], phone_info["longitude"]], 
-                zoom_start=8
+            m = _base_map(
+                location=[phone_info["latitude"], phone_info["longitude"]],
+                zoom_start=LOCATION_MAP_ZOOM
             )
 
             # Add marker with popup
@@ -153,7 +188,7 @@ def get_location_map(phone_info: Dict[str, str]) -> Optional[folium.Map]:
 
     return None
 
-def add_watermark(pdf: FPDF):
+def add_watermark(pdf: "FPDF"):
     """Add a watermark to the current page"""
     # Save current settings
     original_font = pdf.font_family
@@ -179,7 +214,7 @@ def add_watermark(pdf: FPDF):
     pdf.set_font(original_font, size=int(original_font_size))
     pdf.set_text_color(0, 0, 0)  # Reset to black
 
-def generate_map_image(map_obj: folium.Map, filename: str) -> str:
+def generate_map_image(map_obj: "folium.Map", filename: str) -> str:
     """
     Save the map as an HTML file
     """
@@ -196,21 +231,7 @@ def generate_pdf_report(phone_info: Dict[str, str], timestamp: str) -> str:
     """
     Generate an enhanced PDF report with phone number analysis
     """
-    number_types = {
-        0: "FIXED_LINE",
-        1: "MOBILE",
-        2: "FIXED_LINE_OR_MOBILE",
-        3: "TOLL_FREE",
-        4: "PREMIUM_RATE",
-        5: "SHARED_COST",
-        6: "VOIP",
-        7: "PERSONAL_NUMBER",
-        8: "PAGER",
-        9: "UAN",
-        10: "UNKNOWN",
-        27: "EMERGENCY",
-        28: "VOICEMAIL",
-    }
+    from fpdf import FPDF
 
     # Create PDF
     pdf = FPDF()
@@ -241,7 +262,7 @@ def generate_pdf_report(phone_info: Dict[str, str], timestamp: str) -> str:
     pdf.set_font('Arial', '', 12)
     pdf.cell(0, 8, f'Formatted Number: {phone_info["formatted_number"]}', 0, 1)
     pdf.cell(0, 8, f'Validation Status: {"Valid" if phone_info["is_valid"] else "Invalid"}', 0, 1)
-    pdf.cell(0, 8, f'Number Type: {number_types.get(phone_info["number_type"], "Unknown")}', 0, 1)
+    pdf.cell(0, 8, f'Number Type: {NUMBER_TYPES.get(phone_info["number_type"], "Unknown")}', 0, 1)
     pdf.ln(10)
 
     # Location Information
@@ -292,22 +313,6 @@ def generate_report(phone_info: Dict[str, str], timestamp: str) -> str:
     """
     Generate a text report of the phone number analysis
     """
-    number_types = {
-        0: "FIXED_LINE",
-        1: "MOBILE",
-        2: "FIXED_LINE_OR_MOBILE",
-        3: "TOLL_FREE",
-        4: "PREMIUM_RATE",
-        5: "SHARED_COST",
-        6: "VOIP",
-        7: "PERSONAL_NUMBER",
-        8: "PAGER",
-        9: "UAN",
-        10: "UNKNOWN",
-        27: "EMERGENCY",
-        28: "VOICEMAIL",
-    }
-
     report = f"""
     PHONE NUMBER ANALYSIS REPORT
     Generated on: {timestamp}
@@ -316,7 +321,7 @@ def generate_report(phone_info: Dict[str, str], timestamp: str) -> str:
     ----------------
     Formatted Number: {phone_info['formatted_number']}
     Validation Status: {'Valid' if phone_info['is_valid'] else 'Invalid'}
-    Number Type: {number_types.get(phone_info['number_type'], 'Unknown')}
+    Number Type: {NUMBER_TYPES.get(phone_info['number_type'], 'Unknown')}
 
     2. Location Information
     ---------------------
@@ -341,58 +346,74 @@ def generate_report(phone_info: Dict[str, str], timestamp: str) -> str:
     return report
 
 
+def _ipapi_succeeded(body: Dict) -> bool:
+    """Only successful ipapi responses are cached; rate limits and errors are retried"""
+    return body['status_code'] == 200 and not (body['data'] or {}).get('error')
+
+def fetch_ip_json(ip_address: str) -> Dict:
+    """
+    Fetch the raw ipapi.co response for an IP, honouring the record/replay transport
+    """
+    # The stored response is keyed on exactly the address that is requested
+    ip = ip_address.strip().lower()
+
+    def live_call():
+        import requests
+        response = requests.get(f'{IPAPI_BASE_URL}/{ip}/json/')
+        return {
+            'status_code': response.status_code,
+            'data': response.json() if response.status_code == 200 else None
+        }
+
+    return get_transport().fetch("ipapi", ip, live_call, cacheable=_ipapi_succeeded)
+
+def _ip_error_info(ip_address: str, reason: str) -> Dict[str, str]:
+    """Placeholder result for a failed IP lookup, keeping the reason it failed"""
+    st.error(f"Error getting IP information: {reason}")
+    return {
+        "ip": ip_address,
+        "city": "Error",
+        "region": "Error",
+        "country": "Error",
+        "postal": "Error",
+        "latitude": None,
+        "longitude": None,
+        "timezone": "Error",
+        "org": "Error",
+        "asn": "Error",
+        "isp": "Error",
+        "network": None,
+        "error": reason
+    }
 
 def get_ip_info(ip_address: str) -> Dict[str, str]:
     """
     Get detailed information about an IP address
     """
     try:
-        response = requests.get(f'https://ipapi.co/{ip_address}/json/')
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                "ip": data.get("ip", "Unknown"),
-                "city": data.get("city", "Unknown"),
-                "region": data.get("region", "Unknown"),
-                "country": data.get("country_name", "Unknown"),
-                "postal": data.get("postal", "Unknown"),
-                "latitude": data.get("latitude"),
-                "longitude": data.get("longitude"),
-                "timezone": data.get("timezone", "Unknown"),
-                "org": data.get("org", "Unknown"),
-                "asn": data.get("asn", "Unknown"),
-                "isp": data.get("org", "Unknown").split()[0] if data.get("org") else "Unknown"
-            }
-        else:
-            st.error(f"Error getting IP information: {response.status_code}")
-            return {
-                "ip": ip_address,
-                "city": "Error",
-                "region": "Error",
-                "country": "Error",
-                "postal": "Error",
-                "latitude": None,
-                "longitude": None,
-                "timezone": "Error",
-                "org": "Error",
-                "asn": "Error",
-                "isp": "Error"
-            }
-    except Exception as e:
-        st.error(f"Error getting IP information: {str(e)}")
+        response = fetch_ip_json(ip_address)
+        if response['status_code'] != 200:
+            return _ip_error_info(ip_address, str(response['status_code']))
+        data = response['data']
+        # ipapi reports reserved addresses and rate limits as a 200 with an error flag
+        if data.get("error"):
+            return _ip_error_info(ip_address, data.get("reason") or "Unknown error")
         return {
-            "ip": ip_address,
-            "city": "Error",
-            "region": "Error",
-            "country": "Error",
-            "postal": "Error",
-            "latitude": None,
-            "longitude": None,
-            "timezone": "Error",
-            "org": "Error",
-            "asn": "Error",
-            "isp": "Error"
+            "ip": data.get("ip", "Unknown"),
+            "city": data.get("city", "Unknown"),
+            "region": data.get("region", "Unknown"),
+            "country": data.get("country_name", "Unknown"),
+            "postal": data.get("postal", "Unknown"),
+            "latitude": data.get("latitude"),
+            "longitude": data.get("longitude"),
+            "timezone": data.get("timezone", "Unknown"),
+            "org": data.get("org", "Unknown"),
+            "asn": data.get("asn", "Unknown"),
+            "isp": data.get("org", "Unknown").split()[0] if data.get("org") else "Unknown",
+            "network": data.get("network")
         }
+    except Exception as e:
+        return _ip_error_info(ip_address, str(e))
 
 def generate_ip_report(ip_info: Dict[str, str], timestamp: str) -> str:
     """
@@ -431,6 +452,8 @@ def generate_ip_pdf_report(ip_info: Dict[str, str], timestamp: str) -> str:
     """
     Generate an enhanced PDF report with IP address analysis
     """
+    from fpdf import FPDF
+
     # Create PDF
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
@@ -500,16 +523,18 @@ def generate_ip_pdf_report(ip_info: Dict[str, str], timestamp: str) -> str:
         pdf.output(tmp_file.name)
         return tmp_file.name
 
-def get_ip_location_map(ip_info: Dict[str, str]) -> Optional[folium.Map]:
+def get_ip_location_map(ip_info: Dict[str, str]) -> Optional["folium.Map"]:
     """
     Generate a detailed folium map with IP location information
     """
     try:
+        import folium
+        from tile_cache import LOCATION_MAP_ZOOM
         if ip_info["latitude"] and ip_info["longitude"]:
             # Create map centered on location
-            m = folium.Map(
-                location=[ip_info["latitude"], ip_info["longitude"]], 
-                zoom_start=8
+            m = _base_map(
+                location=[ip_info["latitude"], ip_info["longitude"]],
+                zoom_start=LOCATION_MAP_ZOOM
             )
 
             # Add marker with popup
@@ -543,4 +568,114 @@ def get_ip_location_map(ip_info: Dict[str, str]) -> Optional[folium.Map]:
     except Exception as e:
         st.error(f"Error generating map: {str(e)}")
 
-    return None
\ No newline at end of file
+    return None
+
+def get_ip_cluster_map(ip_infos: List[Dict[str, str]]) -> Optional["folium.Map"]:
+    """
+    Generate a clustered folium map for many IP locations
+    """
+    try:
+        import folium
+        from folium.plugins import MarkerCluster
+        points = [info for info in ip_infos if info["latitude"] and info["longitude"]]
+        if not points:
+            return None
+
+        m = _base_map(location=[20, 0], zoom_start=2)
+        cluster = MarkerCluster().add_to(m)
+        for info in points:
+            folium.Marker(
+                [info["latitude"], info["longitude"]],
+                popup=folium.Popup(
+                    f"""
+                    IP: {info['ip']}<br>
+                    Country: {info['country']}<br>
+                    City: {info['city']}<br>
+                    ASN: {info['asn']}
+                    """,
+                    max_width=300
+                )
+            ).add_to(cluster)
+
+        m.fit_bounds([[p["latitude"], p["longitude"]] for p in points])
+        return m
+    except Exception as e:
+        st.error(f"Error generating map: {str(e)}")
+
+    return None
+
+def get_ip_range_map(range_rows: List[Dict]) -> Optional["folium.Map"]:
+    """
+    Generate a folium map with one marker per analysed IP sub-range
+    """
+    try:
+        import folium
+        points = [row for row in range_rows
+                  if row["status"] == "ok" and row["latitude"] and row["longitude"]]
+        if not points:
+            return None
+
+        m = _base_map(location=[20, 0], zoom_start=2)
+        for row in points:
+            folium.CircleMarker(
+                [row["latitude"], row["longitude"]],
+                radius=min(6 + row["addresses"].bit_length(), 30),
+                color='red',
+                fill=True,
+                popup=folium.Popup(
+                    f"""
+                    <b>Sub-range:</b> {row['sub_range']}<br>
+                    Addresses: {row['addresses']:,}<br>
+                    Country: {row['country']}<br>
+                    Region: {row['region']}<br>
+                    City: {row['city']}<br>
+                    ASN: {row['asn']} ({row['org']})
+                    """,
+                    max_width=300
+                )
+            ).add_to(m)
+
+        m.fit_bounds([[row["latitude"], row["longitude"]] for row in points])
+        return m
+    except Exception as e:
+        st.error(f"Error generating map: {str(e)}")
+
+    return None
+
+def get_correlation_map(pairs: List[Dict], max_pairs: int = 500) -> Optional["folium.Map"]:
+    """
+    Generate a folium map joining each phone location to its IP location, coloured by consistency
+    """
+    try:
+        import folium
+        points = [row for row in pairs if row["distance_km"] is not None]
+        if not points:
+            return None
+
+        # Draw the least consistent pairs first when there are too many to show
+        points = sorted(points, key=lambda row: row["consistency"])[:max_pairs]
+
+        m = _base_map(location=[20, 0], zoom_start=2)
+        for row in points:
+            phone_point = [row["phone_latitude"], row["phone_longitude"]]
+            ip_point = [row["ip_latitude"], row["ip_longitude"]]
+            color = 'green' if row["consistency"] >= 70 else 'orange' if row["consistency"] >= 40 else 'red'
+            folium.PolyLine(
+                [phone_point, ip_point],
+                color=color,
+                weight=3,
+                opacity=0.8,
+                tooltip=f"{row['phone']} ↔ {row['ip']}: {row['distance_km']:,.0f} km, score {row['consistency']:.0f}"
+            ).add_to(m)
+            folium.CircleMarker(phone_point, radius=5, color='blue', fill=True,
+                                popup=f"Phone: {row['phone']}<br>{row['phone_location']}").add_to(m)
+            folium.CircleMarker(ip_point, radius=5, color='red', fill=True,
+                                popup=f"IP: {row['ip']}<br>{row['ip_location']}").add_to(m)
+
+        m.fit_bounds([[row[f"{side}_latitude"], row[f"{side}_longitude"]]
+                      for row in points for side in ("phone", "ip")])
+        return m
+    except Exception as e:
+        st.error(f"Error generating map: {str(e)}")
+
+    return None
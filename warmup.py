@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+import phonenumbers
+
+WARMUP_ENABLED = os.environ.get("TAMIZH_WARMUP", "1") != "0"
+WARMUP_LIBRARIES = os.environ.get("TAMIZH_WARMUP_LIBRARIES", "1") != "0"
+
+# Regions whose phonenumbers prefix data is touched ahead of the first lookup
+HOT_REGIONS = [
+    region.strip().upper()
+    for region in os.environ.get("TAMIZH_HOT_REGIONS", "IN,US,GB").split(",")
+    if region.strip()
+]
+
+# Libraries only needed once a map, PDF or upstream lookup is requested
+RENDERING_LIBRARIES = ("requests", "geopy.geocoders", "folium", "folium.plugins", "fpdf", "pandas", "numpy")
+
+# Timings of the last warm-up, in milliseconds per stage
+WARMUP_TIMINGS: Dict[str, float] = {}
+
+
+def warm_up(regions: Optional[List[str]] = None, libraries: bool = WARMUP_LIBRARIES) -> Dict[str, float]:
+    """
+    Preload phonenumbers geo/carrier/timezone data for the hot regions, and optionally
+    the rendering libraries, returning how long each stage took
+    """
+    import importlib
+
+    timings = {}
+
+    started = time.perf_counter()
+    from phonenumbers import carrier, geocoder, timezone
+    timings["phonenumbers data modules"] = (time.perf_counter() - started) * 1000
+
+    for region in regions if regions is not None else HOT_REGIONS:
+        started = time.perf_counter()
+        for number_type in (phonenumbers.PhoneNumberType.MOBILE, phonenumbers.PhoneNumberType.FIXED_LINE):
+            example = phonenumbers.example_number_for_type(region, number_type)
+            if example is None:
+                continue
+            geocoder.description_for_number(example, "en")
+            carrier.name_for_number(example, "en")
+            timezone.time_zones_for_number(example)
+        timings[f"region {region}"] = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    from phone_normalizer import _tries
+    _tries()
+    timings["calling-code trie"] = (time.perf_counter() - started) * 1000
+
+    if libraries:
+        for module_name in RENDERING_LIBRARIES:
+            started = time.perf_counter()
+            importlib.import_module(module_name)
+            timings[f"import {module_name}"] = (time.perf_counter() - started) * 1000
+
+    WARMUP_TIMINGS.clear()
+    WARMUP_TIMINGS.update(timings)
+    return timings
+
+
+def start_warmup(regions: Optional[List[str]] = None, libraries: bool = WARMUP_LIBRARIES) -> threading.Thread:
+    """
+    Run warm_up in a daemon thread so the first page render is not blocked
+    """
+    thread = threading.Thread(target=warm_up, args=(regions, libraries), name="tamizh-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,320 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import asdict
+from typing import Callable, ContextManager, Dict, List, Optional
+
+from ratelimit import TokenBucket
+from results import IPResult, PhoneResult
+
+WATCHLIST_DB_PATH = os.environ.get("TAMIZH_WATCHLIST_DB", "watchlist.sqlite")
+
+# Entries checked more recently than this are not due and cost no lookup
+REFRESH_INTERVAL_SECONDS = float(os.environ.get("TAMIZH_WATCHLIST_REFRESH", str(24 * 3600)))
+
+# Upstream lookups the background scheduler may spend per minute
+LOOKUPS_PER_MINUTE = float(os.environ.get("TAMIZH_WATCHLIST_BUDGET", "30"))
+
+WATCH_KINDS = ("phone", "ip")
+
+logger = logging.getLogger(__name__)
+
+
+def _default_enrichers() -> Dict[str, Callable[[str], Dict]]:
+    from utils import get_ip_info, get_phone_info
+    return {
+        "phone": lambda value: asdict(PhoneResult.from_info(get_phone_info(value))),
+        "ip": lambda value: asdict(IPResult.from_info(get_ip_info(value))),
+    }
+
+
+def _result_hash(result: Dict) -> str:
+    return hashlib.sha256(json.dumps(result, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Watchlist:
+    """
+    Phone numbers and IPs re-enriched over time, with every distinct result kept as a version
+    """
+
+    def __init__(self, path: str = WATCHLIST_DB_PATH,
+                 enrichers: Optional[Dict[str, Callable[[str], Dict]]] = None):
+        self.path = path
+        self._enrichers = enrichers
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                value TEXT NOT NULL,
+                added_at REAL NOT NULL,
+                last_checked REAL NOT NULL DEFAULT 0,
+                last_changed REAL,
+                versions INTEGER NOT NULL DEFAULT 0,
+                last_hash TEXT,
+                UNIQUE (kind, value)
+            );
+            CREATE INDEX IF NOT EXISTS entries_by_staleness ON entries (last_checked);
+            CREATE TABLE IF NOT EXISTS versions (
+                entry_id INTEGER NOT NULL REFERENCES entries (id) ON DELETE CASCADE,
+                version INTEGER NOT NULL,
+                checked_at REAL NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (entry_id, version)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY,
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                checked INTEGER NOT NULL DEFAULT 0,
+                changed INTEGER NOT NULL DEFAULT 0
+            );
+            """
+        )
+        self._connection.commit()
+
+    @property
+    def enrichers(self) -> Dict[str, Callable[[str], Dict]]:
+        if self._enrichers is None:
+            self._enrichers = _default_enrichers()
+        return self._enrichers
+
+    def add(self, kind: str, value: str) -> bool:
+        """Add an entry, returning False if it was already watched"""
+        if kind not in WATCH_KINDS:
+            raise ValueError(f"Unknown watch kind: {kind}")
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO entries (kind, value, added_at) VALUES (?, ?, ?)",
+                (kind, value.strip(), time.time())
+            )
+            self._connection.commit()
+            return cursor.rowcount == 1
+
+    def remove(self, kind: str, value: str):
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM versions WHERE entry_id IN (SELECT id FROM entries WHERE kind = ? AND value = ?)",
+                (kind, value)
+            )
+            self._connection.execute("DELETE FROM entries WHERE kind = ? AND value = ?", (kind, value))
+            self._connection.commit()
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT kind, value, added_at, last_checked, last_changed, versions FROM entries ORDER BY kind, value"
+            ).fetchall()
+        return [
+            {"kind": kind, "value": value, "added_at": added_at, "last_checked": last_checked or None,
+             "last_changed": last_changed, "versions": versions}
+            for kind, value, added_at, last_checked, last_changed, versions in rows
+        ]
+
+    def due_entries(self, limit: int, refresh_interval: float = REFRESH_INTERVAL_SECONDS) -> List[tuple]:
+        """
+        Entries not checked within the refresh interval, oldest and stalest first
+        """
+        with self._lock:
+            return self._connection.execute(
+                "SELECT id, kind, value, versions, last_hash FROM entries "
+                "WHERE last_checked <= ? ORDER BY last_checked, added_at LIMIT ?",
+                (time.time() - refresh_interval, limit)
+            ).fetchall()
+
+    def refresh_entry(self, entry: tuple, slot: Optional[Callable[[], ContextManager]] = None) -> bool:
+        """
+        Re-enrich one entry, storing a new version only if the result changed;
+        the lookup runs inside slot() when one is given
+        """
+        entry_id, kind, value = entry[:3]
+        with slot() if slot is not None else nullcontext():
+            result = self.enrichers[kind](value)
+        now = time.time()
+
+        with self._lock:
+            # Reread inside the lock; a manual and a background run may refresh the same entry
+            row = self._connection.execute(
+                "SELECT versions, last_hash FROM entries WHERE id = ?", (entry_id,)
+            ).fetchone()
+            if row is None:
+                # Removed while the lookup was running
+                return False
+            versions, last_hash = row
+
+            if result.get("status") != "ok":
+                # Keep the last good version; retry on the next due pass
+                self._connection.execute("UPDATE entries SET last_checked = ? WHERE id = ?", (now, entry_id))
+                self._connection.commit()
+                return False
+
+            result_hash = _result_hash(result)
+            if result_hash == last_hash:
+                self._connection.execute("UPDATE entries SET last_checked = ? WHERE id = ?", (now, entry_id))
+                self._connection.commit()
+                return False
+
+            self._connection.execute(
+                "INSERT INTO versions (entry_id, version, checked_at, result) VALUES (?, ?, ?, ?)",
+                (entry_id, versions + 1, now, json.dumps(result, sort_keys=True))
+            )
+            self._connection.execute(
+                "UPDATE entries SET last_checked = ?, last_changed = ?, versions = ?, last_hash = ? WHERE id = ?",
+                (now, now, versions + 1, result_hash, entry_id)
+            )
+            self._connection.commit()
+            return True
+
+    def run_once(self, budget: int, refresh_interval: float = REFRESH_INTERVAL_SECONDS,
+                 acquire: Optional[Callable[[], bool]] = None,
+                 slot: Optional[Callable[[], ContextManager]] = None) -> Dict[str, int]:
+        """
+        Refresh up to `budget` due entries, stalest first, recording the run;
+        stops early once acquire() refuses a lookup
+        """
+        due = self.due_entries(budget, refresh_interval)
+        if not due:
+            return {"run": None, "checked": 0, "changed": 0}
+
+        with self._lock:
+            run_id = self._connection.execute(
+                "INSERT INTO runs (started_at) VALUES (?)", (time.time(),)
+            ).lastrowid
+            self._connection.commit()
+
+        checked = changed = 0
+        try:
+            for entry in due:
+                if acquire is not None and not acquire():
+                    break
+                checked += 1
+                if self.refresh_entry(entry, slot):
+                    changed += 1
+        finally:
+            with self._lock:
+                self._connection.execute(
+                    "UPDATE runs SET finished_at = ?, checked = ?, changed = ? WHERE id = ?",
+                    (time.time(), checked, changed, run_id)
+                )
+                self._connection.commit()
+        return {"run": run_id, "checked": checked, "changed": changed}
+
+    def last_run(self) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT id, started_at, finished_at, checked, changed FROM runs "
+                "WHERE finished_at IS NOT NULL ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("run", "started_at", "finished_at", "checked", "changed"), row))
+
+    def diffs_since(self, since: float) -> List[Dict]:
+        """
+        Field-level changes for every version stored after `since`, against the version before it
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT e.kind, e.value, v.version, v.checked_at, v.result, p.result
+                FROM versions v
+                JOIN entries e ON e.id = v.entry_id
+                LEFT JOIN versions p ON p.entry_id = v.entry_id AND p.version = v.version - 1
+                WHERE v.checked_at > ?
+                ORDER BY v.checked_at
+                """,
+                (since,)
+            ).fetchall()
+
+        diffs = []
+        for kind, value, version, checked_at, result, previous in rows:
+            if previous is None:
+                # First enrichment of a new entry, nothing to compare against
+                continue
+            new, old = json.loads(result), json.loads(previous)
+            for field in sorted(new):
+                if new[field] != old.get(field):
+                    diffs.append({
+                        "kind": kind, "value": value, "version": version, "changed_at": checked_at,
+                        "field": field, "old": old.get(field), "new": new[field],
+                    })
+        return diffs
+
+    def last_run_diffs(self) -> List[Dict]:
+        """Changes found by the most recent run"""
+        run = self.last_run()
+        return self.diffs_since(run["started_at"]) if run else []
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class WatchlistScheduler:
+    """
+    Background thread re-enriching due watchlist entries within a lookup rate budget.
+    admit() and slot() let each lookup also pass shared admission control.
+    """
+
+    def __init__(self, watchlist: Watchlist, lookups_per_minute: float = LOOKUPS_PER_MINUTE,
+                 tick_seconds: float = 30.0, refresh_interval: float = REFRESH_INTERVAL_SECONDS,
+                 admit: Optional[Callable[[], bool]] = None,
+                 slot: Optional[Callable[[], ContextManager]] = None):
+        self.watchlist = watchlist
+        self.budget = TokenBucket(rate=lookups_per_minute / 60, capacity=max(1.0, lookups_per_minute))
+        self.tick_seconds = tick_seconds
+        self.refresh_interval = refresh_interval
+        self.admit = admit
+        self.slot = slot
+        self.last_result: Optional[Dict[str, int]] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        if self.running:
+            return
+        # A fresh event per thread, so a thread still finishing after stop() cannot be revived
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, args=(self._stop,), name="tamizh-watchlist",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 0.0):
+        """
+        Ask the thread to stop before its next lookup, waiting at most timeout seconds for it
+        """
+        self._stop.set()
+        if self._thread is not None and timeout:
+            self._thread.join(timeout)
+
+    def _loop(self, stop: threading.Event):
+        def acquire() -> bool:
+            if stop.is_set() or not self.budget.try_acquire():
+                return False
+            return self.admit is None or self.admit()
+
+        while not stop.is_set():
+            budget = int(self.budget.available())
+            if budget:
+                try:
+                    self.last_result = self.watchlist.run_once(
+                        budget, self.refresh_interval, acquire=acquire, slot=self.slot
+                    )
+                    self.last_error = None
+                except Exception as e:
+                    # Keep the thread alive; the entries stay due and are retried next tick
+                    logger.exception("Watchlist re-enrichment run failed")
+                    self.last_error = str(e)
+            stop.wait(self.tick_seconds)